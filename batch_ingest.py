@@ -0,0 +1,116 @@
+"""
+SPINS Batch Ingestion
+Loads every PowerTabs, brand and trend workbook in a directory: files are
+parsed in parallel worker processes, then written to the history and brand
+stores in a single transaction
+"""
+
+import os
+
+from brand_data import read_raw_sheet
+from brand_store import apply_raw_rows, get_connection
+from config import (
+    BRAND_STORE_FILE, HISTORY_DB_FILE,
+    REQUIRED_BRAND_SHEETS, REQUIRED_RAW_COLUMNS, REQUIRED_TREND_SHEETS,
+)
+from history_store import get_connection as get_history_connection
+from history_store import delete_expired_snapshots, upsert_snapshot
+from powertabs_cache import run_in_pool
+from powertabs_loader import (
+    SUMMARY_SHEETS, check_powertabs_workbook, read_powertabs_workbook, summarize_powertabs_data,
+)
+from workbook_check import read_sheet_headers
+
+
+def classify_workbook(sheet_names):
+    """'powertabs', 'brand' or 'trend' from a workbook's sheet names, None if unrecognized"""
+    if all(sheet in sheet_names for sheet in SUMMARY_SHEETS):
+        return 'powertabs'
+    # Brand workbooks also have a Raw sheet, so check them before trend workbooks
+    if all(sheet in sheet_names for sheet in REQUIRED_BRAND_SHEETS):
+        return 'brand'
+    if all(sheet in sheet_names for sheet in REQUIRED_TREND_SHEETS):
+        return 'trend'
+    return None
+
+
+def ingest_workbook(file_path):
+    """Worker: validate and parse one workbook
+
+    Returns a dict with the file's kind and parsed payload, or its error;
+    errors are returned rather than raised so one bad file doesn't fail the batch.
+    """
+    result = {'file': os.path.basename(file_path), 'kind': None, 'error': None}
+    try:
+        sheet_names, headers = read_sheet_headers(file_path, {'Raw': 1})
+        kind = classify_workbook(sheet_names)
+        if kind == 'powertabs':
+            problems = check_powertabs_workbook(file_path)
+        else:
+            missing = [col for col in REQUIRED_RAW_COLUMNS if col not in headers.get('Raw', [])]
+            problems = [f"Raw: missing columns {', '.join(missing)}"] if missing else []
+
+        if kind is None:
+            result['error'] = "Not a PowerTabs, brand or trend workbook"
+        elif problems:
+            result['error'] = "; ".join(problems)
+        elif kind == 'powertabs':
+            summary = summarize_powertabs_data(read_powertabs_workbook(file_path, sheets=SUMMARY_SHEETS))
+            if summary is None:
+                result['error'] = "No 52 Weeks row on the Overview sheet"
+            else:
+                result['summary'] = summary
+        else:
+            result['rows'] = read_raw_sheet(file_path)
+        result['kind'] = kind
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def find_workbooks(directory):
+    """Excel workbooks in directory, oldest first so newer reports win on overlap"""
+    paths = [
+        os.path.join(directory, f) for f in os.listdir(directory)
+        if f.endswith('.xlsx') and not f.startswith('~$')
+    ]
+    return sorted(paths, key=os.path.getmtime)
+
+
+def ingest_directory(directory, store_path=BRAND_STORE_FILE, history_path=HISTORY_DB_FILE):
+    """Parse every workbook in directory and load the results in one transaction
+
+    PowerTabs reports become history snapshots, and brand and trend Raw sheets
+    are upserted into the brand store without deleting rows from other files.
+    If any write fails nothing is committed. Returns one result per file with
+    'status' set to 'loaded', 'skipped' or 'failed'.
+    """
+    paths = find_workbooks(directory)
+    if not paths:
+        return []
+    results = run_in_pool(ingest_workbook, paths)
+
+    # Create the history tables before attaching, outside the load transaction
+    get_history_connection(history_path).close()
+
+    conn = get_connection(store_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS history", (history_path,))
+        with conn:
+            delete_expired_snapshots(conn, table='history.historical_snapshots')
+            for result in results:
+                if result['error']:
+                    result['status'] = 'failed'
+                elif result['kind'] == 'powertabs':
+                    saved = upsert_snapshot(conn, result['summary'], table='history.historical_snapshots')
+                    result['status'] = 'loaded' if saved else 'skipped'
+                else:
+                    table = 'brand_rows' if result['kind'] == 'brand' else 'trend_rows'
+                    result['report'] = apply_raw_rows(
+                        conn, result.pop('rows'), result['file'], table, remove_missing=False
+                    )
+                    result['status'] = 'loaded'
+    finally:
+        conn.close()
+
+    return results
@@ -0,0 +1,342 @@
+"""
+SPINS Benchmarks
+Times the ingestion and analysis hot paths on synthetic PowerTabs, brand and
+trend workbooks, and writes the results to JSON so runs can be compared
+across commits
+
+Usage:
+    python benchmark.py --brands 300 --geographies 60 --files 12 --output after.json
+    python benchmark.py --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import openpyxl
+
+import powertabs_cache
+from brand_data import compact_brand_data, partition_by_time_frame, read_brand_data
+from brand_insights import CompetitorIndex, generate_insights
+from config import COMPACT_BRAND_DATA, DEFAULT_BRAND, NATURAL_CHANNEL
+from file_hash import file_sha256
+from powertabs_cache import load_powertabs_summaries, load_powertabs_workbook, workbook_cache
+from powertabs_loader import POWERTABS_SHEETS
+from retailer_scorecard import priority_tiers, score_retailers
+from shared_data import read_only
+from trend_data import TrendStore, read_trend_data
+
+RAW_COLUMNS = [
+    'DESCRIPTION', 'GEOGRAPHY', 'TIME FRAME', 'Dollars', 'Dollars, % Chg, Yago', 'Units',
+    'Units, % Chg, Yago', 'Max % ACV', 'Max % ACV, +/- Chg, Yago', 'TDP', '# of Stores Selling',
+    'Dollars, Promo', 'Dollars, Non-Promo', 'Units, Promo', 'Units, Non-Promo', 'ARP', 'ARP, % Chg, Yago',
+]
+BRAND_TIME_FRAMES = ['4 Weeks', '12 Weeks', '52 Weeks']
+POWERTABS_PERIODS = ['52 Weeks', '24 Weeks', '12 Weeks', '4 Weeks']
+SCORECARD_TIERS = [(70, 'High'), (50, 'Medium')]
+
+
+# Synthetic workbooks
+
+def _write_workbook(path, sheets):
+    """Write {sheet name: rows} with openpyxl's streaming writer"""
+    wb = openpyxl.Workbook(write_only=True)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        for row in rows:
+            ws.append(row)
+    wb.save(path)
+
+
+def _raw_row(rng, brand, geo, time_frame):
+    dollars = float(rng.uniform(1e3, 1e6))
+    units = int(rng.integers(100, 10000))
+    promo = dollars * float(rng.uniform(0.1, 0.6))
+    # A few blanks and dashes, as SPINS exports have
+    growth = float(rng.normal(0.05, 0.3)) if rng.random() > 0.05 else ''
+    acv = round(float(rng.uniform(5, 95)), 1) if rng.random() > 0.05 else '-'
+    return [
+        brand, geo, time_frame, dollars, growth, units, float(rng.normal(0.05, 0.2)),
+        acv, float(rng.normal(0, 6)), float(rng.uniform(1, 200)), int(rng.integers(0, 500)),
+        promo, dollars - promo, units * 0.3, units * 0.7, dollars / units, float(rng.normal(0, 0.05)),
+    ]
+
+
+def _brand_names(count):
+    return [DEFAULT_BRAND] + [f'BRAND {i}' for i in range(count - 1)]
+
+
+def _geography_names(count):
+    return [NATURAL_CHANNEL] + [f'RETAILER {i} - TOTAL US' for i in range(count - 1)]
+
+
+def write_brand_workbook(path, brands, geographies, rng, end_date):
+    rows = [RAW_COLUMNS]
+    for period in BRAND_TIME_FRAMES:
+        time_frame = f"{period} Ending {end_date:%m/%d/%Y}"
+        for geo in _geography_names(geographies):
+            for brand in _brand_names(brands):
+                rows.append(_raw_row(rng, brand, geo, time_frame))
+    _write_workbook(path, {'Raw': rows, 'Pivot': [['Pivot']], 'Category Charts (52-wks)': [['Charts']]})
+    return len(rows) - 1
+
+
+def write_trend_workbook(path, geographies, weeks, rng, end_date):
+    rows = [RAW_COLUMNS]
+    for geo in _geography_names(geographies):
+        for week in range(weeks):
+            week_end = end_date - timedelta(weeks=week)
+            rows.append(_raw_row(rng, DEFAULT_BRAND, geo, f"12 Weeks Ending {week_end:%m/%d/%Y}"))
+    # Exports aren't sorted by date
+    header, body = rows[0], rows[1:]
+    body = [body[i] for i in rng.permutation(len(body))]
+    _write_workbook(path, {'Raw': [header] + body, 'Charts': [['Charts']]})
+    return len(body)
+
+
+def _powertabs_sheet(header, rows, end_date):
+    width = len(header)
+    title = [['SPINS PowerTabs'] + [None] * (width - 1)]
+    period = [[f"Period: 52 Weeks Ending {end_date:%m/%d/%Y} | Geo: {NATURAL_CHANNEL}"] + [None] * (width - 1)]
+    return title + period + [[None] * width, header] + rows
+
+
+def write_powertabs_workbook(path, retailers, rng, end_date):
+    scale = float(rng.uniform(0.8, 1.2))
+    overview = [
+        [period, 1e6 * scale * (i + 1), float(rng.normal(0.05, 0.1)), 1e5 * scale * (i + 1), float(rng.normal(0.03, 0.1))]
+        for i, period in enumerate(POWERTABS_PERIODS)
+    ]
+    by_retailer = [
+        [f'RETAILER {i}', float(rng.uniform(1e4, 2e6)), float(rng.normal(0, 1e4)), float(rng.normal(0.05, 0.3))]
+        for i in range(retailers)
+    ]
+    by_retailer.sort(key=lambda row: -row[1])
+    growth = [
+        [f'RETAILER {i}', float(rng.uniform(0, 0.2)), float(rng.uniform(1, 50)), float(rng.uniform(5, 95)),
+         float(rng.uniform(1, 10)), str(rng.choice(['Velocity', 'Distribution', 'Price']))]
+        for i in range(min(retailers, 10))
+    ]
+    drivers = [
+        [driver, float(rng.uniform(1, 10)), float(rng.uniform(1, 10)), float(rng.normal(0, 1)), float(rng.normal(0, 5e4))]
+        for driver in ['Distribution', 'Velocity', 'Price', 'Promotion']
+    ]
+    promos = [
+        [i, 'TPR', 5.0, 4.0, float(-rng.uniform(0.05, 0.4)), float(rng.uniform(0, 1)), float(rng.uniform(0, 1)), int(rng.integers(1, 8))]
+        for i in range(20)
+    ]
+    _write_workbook(path, {
+        'Overview': _powertabs_sheet(['Time Period', 'Dollars', 'Dollars % Chg', 'Units', 'Units % Chg'], overview, end_date),
+        'Brand by Retailer': _powertabs_sheet(['Retailer', 'Sales', 'Absolute Chg', '% Chg'], by_retailer, end_date),
+        'Retailer Growth': _powertabs_sheet(
+            ['Top 10 Retailers by Dollar Change', 'Dollar Share', 'TDP', 'Max % ACV', 'Avg # Items', 'Primary Driver of Growth'],
+            growth, end_date),
+        'Growth Drivers': _powertabs_sheet(['Driver', 'YAG', 'Latest', 'Chg', 'Dollars Chg Due To'], drivers, end_date),
+        'Promo Summary': _powertabs_sheet(
+            ['Promo ID', 'Promo Type', 'Base Price', 'Promo Price', '% Disc', '$ % Lift', 'U % Lift', '# of Weeks'],
+            promos, end_date),
+        'Brand vs. Category': _powertabs_sheet(['Metric', 'Brand', 'Category'], [['Dollars', 1.0, 2.0]], end_date),
+    })
+
+
+def generate_workbooks(workdir, args):
+    """Write every synthetic workbook into workdir, returning their paths and sizes"""
+    rng = np.random.default_rng(args.seed)
+    end_date = datetime(2025, 10, 5)
+
+    brand_path = os.path.join(workdir, 'brand.xlsx')
+    trend_path = os.path.join(workdir, 'trend.xlsx')
+    brand_rows = write_brand_workbook(brand_path, args.brands, args.geographies, rng, end_date)
+    trend_rows = write_trend_workbook(trend_path, args.geographies, args.weeks, rng, end_date)
+
+    powertabs_paths = []
+    for i in range(args.files):
+        path = os.path.join(workdir, f'powertabs_{i:02d}.xlsx')
+        # One report per month, newest last
+        write_powertabs_workbook(path, args.retailers, rng, end_date - timedelta(weeks=4 * (args.files - 1 - i)))
+        powertabs_paths.append(path)
+
+    return {
+        'brand': brand_path,
+        'trend': trend_path,
+        'powertabs': powertabs_paths,
+    }, {
+        'brand_rows': brand_rows,
+        'trend_rows': trend_rows,
+        'brand_file_bytes': os.path.getsize(brand_path),
+        'trend_file_bytes': os.path.getsize(trend_path),
+        'powertabs_file_bytes': os.path.getsize(powertabs_paths[0]),
+    }
+
+
+# Benchmarks
+
+def _fresh_caches(workdir, hashes, run_id):
+    """Empty the in-process caches and point sidecars at a new, empty directory"""
+    for file_hash in hashes:
+        workbook_cache.evict(file_hash)
+    powertabs_cache._summary_cache.clear()
+    powertabs_cache.sidecar_dir = os.path.join(workdir, f'run_{run_id}', 'sidecars')
+
+
+def _load_all_sheets(path, file_hash):
+    data = load_powertabs_workbook(path, file_hash)
+    for key in POWERTABS_SHEETS.values():
+        data[key]
+    return data
+
+
+def run_benchmarks(files, workdir, repeat):
+    """Time every stage repeat times, returning {stage: [seconds, ...]}"""
+    timings = {}
+
+    def timed(stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    powertabs_paths = files['powertabs']
+    hashes = [file_sha256(path) for path in powertabs_paths]
+    first_path, first_hash = powertabs_paths[0], hashes[0]
+
+    for run in range(repeat):
+        # PowerTabs report: first open parses every sheet, then sidecars, then memory
+        _fresh_caches(workdir, hashes, f'{run}_single')
+        timed('load_powertabs_data (parse)', lambda: _load_all_sheets(first_path, file_sha256(first_path)))
+        workbook_cache.evict(first_hash)
+        timed('load_powertabs_data (sidecar)', lambda: _load_all_sheets(first_path, file_sha256(first_path)))
+        data = timed('load_powertabs_data (memory)', lambda: _load_all_sheets(first_path, file_sha256(first_path)))
+        timed('powertabs scorecard', lambda: priority_tiers(
+            score_retailers(data['retailers'], 'Sales', '% Chg')['Performance Score'], SCORECARD_TIERS, 'Low'))
+
+        # Historical Trends across every report
+        _fresh_caches(workdir, hashes, f'{run}_history')
+        timed('historical trends (parse)', load_powertabs_summaries, powertabs_paths, hashes)
+        timed('historical trends (cached)', load_powertabs_summaries, powertabs_paths, hashes)
+
+        # Brand and trend workbooks
+        def load_brand_data():
+            df = read_brand_data(files['brand'])
+            return compact_brand_data(df) if COMPACT_BRAND_DATA else df
+        brand_df = timed('load_brand_data', load_brand_data)
+        trend_store = timed('load_trend_data', lambda: TrendStore(read_trend_data(files['trend'])))
+        trend_df = trend_store.frame
+        timed('trend channel slice', trend_store.channels, trend_store.geographies[:3])
+
+        brand_df, brand_periods = timed('partition time frames', partition_by_time_frame, brand_df)
+        selected_period = sorted(brand_periods)[-1]
+        filtered_df = timed('select time frame', lambda: read_only(brand_periods[selected_period]))
+        competitor_index = timed('competitor index', CompetitorIndex, filtered_df)
+        timed('generate_insights', generate_insights, filtered_df, brand_df, trend_df, selected_period, competitor_index)
+
+        humble_data = filtered_df[filtered_df['DESCRIPTION'] == DEFAULT_BRAND]
+        timed('brand scorecard', lambda: priority_tiers(
+            score_retailers(humble_data, 'Dollars', 'Dollars, % Chg, Yago')['Performance Score'], SCORECARD_TIERS, 'Low'))
+
+    return timings
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"{'Stage':<34}{'median':>10}{'min':>10}" + (f"{'baseline':>11}{'change':>9}" if baseline else ""))
+    for stage, result in results.items():
+        line = f"{stage:<34}{result['median_s'] * 1000:>8.1f}ms{result['min_s'] * 1000:>8.1f}ms"
+        if baseline and stage in baseline:
+            before = baseline[stage]['median_s']
+            line += f"{before * 1000:>9.1f}ms{(result['median_s'] / before - 1) * 100:>+8.0f}%" if before else ""
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SPINS dashboard loading and analysis on synthetic data')
+    parser.add_argument('--brands', type=int, default=30, help='Brands per geography in the brand workbook (default: 30)')
+    parser.add_argument('--geographies', type=int, default=25, help='Geographies in the brand and trend workbooks (default: 25)')
+    parser.add_argument('--weeks', type=int, default=104, help='Weekly time frames in the trend workbook (default: 104)')
+    parser.add_argument('--retailers', type=int, default=25, help='Rows on each PowerTabs Brand by Retailer sheet (default: 25)')
+    parser.add_argument('--files', type=int, default=6, help='PowerTabs reports for Historical Trends (default: 6)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs of every stage (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data')
+    parser.add_argument('--workdir', help='Directory for generated workbooks (default: a temporary directory)')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON results file (default: benchmark_results.json)')
+    parser.add_argument('--compare', help='Earlier JSON results file to compare against')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        baseline = previous['results']
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='spins_benchmark_')
+    os.makedirs(workdir, exist_ok=True)
+    sidecar_dir = powertabs_cache.sidecar_dir
+
+    print(f"Generating workbooks in {workdir}...")
+    start = time.perf_counter()
+    files, data_sizes = generate_workbooks(workdir, args)
+    print(f"  {data_sizes['brand_rows']:,} brand rows, {data_sizes['trend_rows']:,} trend rows, "
+          f"{args.files} PowerTabs reports ({time.perf_counter() - start:.1f}s)")
+    print()
+
+    try:
+        timings = run_benchmarks(files, workdir, args.repeat)
+    finally:
+        powertabs_cache.sidecar_dir = sidecar_dir
+
+    results = {
+        stage: {
+            'median_s': statistics.median(runs),
+            'min_s': min(runs),
+            'runs_s': runs,
+        }
+        for stage, runs in timings.items()
+    }
+    report = {
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'scale': {
+            'brands': args.brands,
+            'geographies': args.geographies,
+            'weeks': args.weeks,
+            'retailers': args.retailers,
+            'files': args.files,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'data': data_sizes,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if baseline and previous['scale'] != report['scale']:
+        print(f"⚠ {args.compare} was run at a different scale: {previous['scale']}")
+    print_results(results, baseline)
+    print()
+    print(f"✓ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
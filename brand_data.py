@@ -0,0 +1,207 @@
+"""
+SPINS Brand Data
+Loading and preparation of the 'Raw' sheet from the SPINs Brand and Retailers workbook
+"""
+
+from types import MappingProxyType
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES
+
+from config import BRAND_DATA_FILE
+
+# Columns containing any of these are coerced to numbers, non-numeric cells become NaN
+NUMERIC_COLUMN_MARKERS = ['% Chg', '% ACV', 'ARP']
+
+# Cell text pd.read_excel reads as NaN by default (its na_values), plus Excel
+# error values, which it also turns into NaN
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]) | frozenset(ERROR_CODES)
+
+# Low-cardinality text dimensions stored as pandas Categoricals when compacting
+DIMENSION_COLUMNS = ['DESCRIPTION', 'GEOGRAPHY', 'TIME FRAME']
+
+
+def _is_coerced_column(name):
+    return any(marker in str(name) for marker in NUMERIC_COLUMN_MARKERS)
+
+
+def _to_float(value):
+    if value is None or isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _header_names(header_row):
+    """Column names the way pd.read_excel builds them (Unnamed: n, X.1 for duplicates)"""
+    names = []
+    seen = {}
+    for i, value in enumerate(header_row):
+        name = f"Unnamed: {i}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+class _ColumnBuffer:
+    """Growable column that stays a float64 array until it sees a non-numeric value
+
+    NA_STRINGS count as missing, so a measure column holding 'n/a' stays
+    numeric as it would with pd.read_excel.
+    """
+
+    def __init__(self, coerce, capacity=4096):
+        self.coerce = coerce
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+        self.all_int = True
+        self.objects = None
+
+    def append(self, value):
+        if isinstance(value, str) and value in NA_STRINGS:
+            value = None
+        if self.objects is not None:
+            self.objects.append(np.nan if value is None else value)
+            return
+
+        if self.coerce:
+            value = _to_float(value)
+        elif value is None:
+            value = np.nan
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            # Text, dates or Excel error strings - keep this column as Python objects
+            self.objects = self.to_array().tolist()
+            self.objects.append(value)
+            self.values = None
+            return
+
+        if self.size == len(self.values):
+            self.values = np.resize(self.values, len(self.values) * 2)
+        if self.all_int and not isinstance(value, int):
+            self.all_int = False
+        self.values[self.size] = value
+        self.size += 1
+
+    def to_array(self):
+        if self.objects is not None:
+            return np.array(self.objects, dtype=object)
+        values = self.values[:self.size]
+        if self.all_int and self.size:
+            return values.astype(np.int64)
+        return values
+
+
+def read_raw_sheet(file_source, sheet_name='Raw'):
+    """Stream a Raw sheet row by row into typed columns
+
+    Numeric coercion of '% Chg', '% ACV' and 'ARP' columns happens in the same
+    pass, so the object-dtype frame and its converted copies never coexist.
+    """
+    wb = openpyxl.load_workbook(file_source, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        # Exports often carry stale dimension tags; read every populated row
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        while header and header[-1] is None:
+            header = header[:-1]
+        columns = _header_names(header)
+        buffers = [_ColumnBuffer(_is_coerced_column(name)) for name in columns]
+        width = len(columns)
+
+        for row in rows:
+            row = row[:width]
+            if all(value is None for value in row):
+                continue
+            for buffer, value in zip(buffers, row):
+                buffer.append(value)
+            for buffer in buffers[len(row):]:
+                buffer.append(None)
+    finally:
+        wb.close()
+
+    return pd.DataFrame({name: buffer.to_array() for name, buffer in zip(columns, buffers)})
+
+
+def read_brand_data(file_source=None):
+    """Load the Raw sheet of the brand and retailers workbook"""
+    return read_raw_sheet(BRAND_DATA_FILE if file_source is None else file_source)
+
+
+def _downcast_measure(col):
+    """float32/int32 copy of a numeric column, or the column itself if that would lose precision"""
+    if pd.api.types.is_integer_dtype(col):
+        info = np.iinfo(np.int32)
+        if col.empty or (col.min() >= info.min and col.max() <= info.max):
+            return col.astype(np.int32)
+        return col
+
+    if pd.api.types.is_float_dtype(col) and col.dtype != np.float32:
+        narrowed = col.astype(np.float32)
+        if narrowed.astype(col.dtype).equals(col):
+            return narrowed
+    return col
+
+
+def compact_brand_data(df):
+    """Shrink the in-memory size of a Raw brand frame without changing any values
+
+    Text dimensions become Categoricals and measures are downcast to
+    float32/int32 only where every value round-trips exactly. The before and
+    after sizes in bytes are stored in df.attrs['memory_report'].
+    """
+    before = int(df.memory_usage(deep=True).sum())
+
+    compact = {}
+    for name in df.columns:
+        col = df[name]
+        if name in DIMENSION_COLUMNS and col.dtype == object:
+            compact[name] = col.astype('category')
+        elif pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+            compact[name] = _downcast_measure(col)
+        else:
+            compact[name] = col
+    compact = pd.DataFrame(compact, index=df.index)
+
+    compact.attrs['memory_report'] = {
+        'before_bytes': before,
+        'after_bytes': int(compact.memory_usage(deep=True).sum()),
+    }
+    return compact
+
+
+def partition_by_time_frame(df):
+    """Sort rows by TIME FRAME once and slice out each time frame
+
+    Returns (sorted frame, read-only {time frame: rows}). The sort is stable,
+    so each time frame keeps its sheet order, and the partitions are slices
+    of the sorted frame rather than copies; don't modify them in place.
+    """
+    ordered = df.sort_values('TIME FRAME', kind='stable', na_position='last')
+    codes, time_frames = pd.factorize(ordered['TIME FRAME'])
+    # Missing time frames sort last with code -1 and are left out
+    valid = codes[codes >= 0]
+    starts = np.flatnonzero(np.r_[True, valid[1:] != valid[:-1]]) if len(valid) else []
+    stops = list(starts[1:]) + [len(valid)]
+    partitions = {
+        time_frames[valid[start]]: ordered.iloc[start:stop]
+        for start, stop in zip(starts, stops)
+    }
+    return ordered, MappingProxyType(partitions)
@@ -0,0 +1,275 @@
+"""
+SPINS Brand Insights Engine
+Alerts, opportunities, competitive threats and recommendations for HUMBLE,
+computed with whole-column operations over the selected period's brand data
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_BRAND, TOP_N_BRANDS
+
+
+class CompetitorIndex:
+    """Per-geography brand rankings by dollars for one time frame
+
+    Built once per loaded file and period so threat detection and the
+    Competitive Analysis page look geographies up instead of re-scanning the
+    Raw sheet. Each geography keeps its top_n brands plus its top
+    COMPETITORS_PER_GEO brands other than DEFAULT_BRAND.
+    """
+
+    COMPETITORS_PER_GEO = 5
+
+    def __init__(self, period_df, top_n=TOP_N_BRANDS, brand=DEFAULT_BRAND):
+        self.period_df = period_df
+        self.top_n = top_n
+        self.brand = brand
+
+        # Row positions of every geography, in sheet order
+        self._geo_rows = {
+            geo: rows for geo, rows in period_df.groupby('GEOGRAPHY', observed=True, sort=False).indices.items()
+        }
+
+        # Descending stable sort matches nlargest's tie order
+        ranked = period_df.dropna(subset=['Dollars']).sort_values('Dollars', ascending=False, kind='mergesort')
+        by_geo = ranked.groupby('GEOGRAPHY', observed=True, sort=False)
+        rank = by_geo.cumcount() + 1
+
+        is_competitor = ranked['DESCRIPTION'] != brand
+        competitor_rank = ranked[is_competitor].groupby('GEOGRAPHY', observed=True, sort=False).cumcount() + 1
+        competitor_rank = competitor_rank.reindex(ranked.index)
+
+        keep = (rank <= top_n) | (competitor_rank <= self.COMPETITORS_PER_GEO)
+        entries = ranked[keep].assign(rank=rank[keep], competitor_rank=competitor_rank[keep])
+
+        # Share of the geography's top_n dollars, as shown on the Competitive Analysis page
+        in_top = entries['rank'] <= top_n
+        top_total = entries['Dollars'].where(in_top).groupby(entries['GEOGRAPHY'], observed=True).transform('sum')
+        entries['Share'] = (entries['Dollars'] / top_total * 100).where(in_top)
+
+        self.entries = entries
+        self._entry_rows = {
+            geo: rows for geo, rows in entries.groupby('GEOGRAPHY', observed=True, sort=False).indices.items()
+        }
+
+    @property
+    def geographies(self):
+        return sorted(self._geo_rows)
+
+    def geo_rows(self, geo):
+        """Every row of the period for one geography, in sheet order"""
+        return self.period_df.iloc[self._geo_rows.get(geo, [])]
+
+    def top_brands(self, geo, n=None):
+        """Largest brands by dollars in a geography with their growth and Share"""
+        n = self.top_n if n is None else min(n, self.top_n)
+        entries = self.entries.iloc[self._entry_rows.get(geo, [])]
+        return entries[entries['rank'] <= n]
+
+    def competitor_entries(self, geos):
+        """Top competitors of each geography in geos, grouped in that order"""
+        competitors = self.entries[self.entries['competitor_rank'] <= self.COMPETITORS_PER_GEO]
+        geo_rank = pd.Series(np.arange(len(geos)), index=pd.Index(geos, dtype=object))
+        position = competitors['GEOGRAPHY'].astype(object).map(geo_rank)
+        competitors = competitors[position.notna()]
+        return competitors.iloc[np.argsort(position.dropna().to_numpy(), kind='stable')]
+
+
+def _competitor_threats(competitor_index, humble_data, avg_growth):
+    """Top-5 competitors per HUMBLE geography growing 10+ points faster than HUMBLE
+
+    Only competitors with more than half of HUMBLE's sales in that geography
+    count. Rows come back grouped by geography in HUMBLE's row order, largest
+    competitor first.
+    """
+    geo_order = list(pd.Index(humble_data['GEOGRAPHY'].dropna().unique()).astype(object))
+    top_competitors = competitor_index.competitor_entries(geo_order)
+
+    humble_sales = humble_data.groupby('GEOGRAPHY', observed=True)['Dollars'].sum()
+    humble_sales.index = humble_sales.index.astype(object)
+
+    return top_competitors[
+        (top_competitors['Dollars, % Chg, Yago'] > avg_growth + 0.10)
+        & (top_competitors['Dollars'] > top_competitors['GEOGRAPHY'].astype(object).map(humble_sales) * 0.5)
+    ]
+
+
+def generate_insights(filtered_df, brand_df, trend_df, selected_period, competitor_index=None):
+    """Generate strategic insights and recommendations
+
+    Pass the period's CompetitorIndex to reuse it; one is built otherwise.
+    """
+    insights = {
+        'alerts': [],
+        'opportunities': [],
+        'threats': [],
+        'recommendations': [],
+        'key_metrics': {}
+    }
+
+    # Get HUMBLE data
+    humble_data = filtered_df[filtered_df['DESCRIPTION'] == DEFAULT_BRAND]
+
+    if humble_data.empty:
+        return insights
+
+    dollars = humble_data['Dollars']
+    units = humble_data['Units']
+    stores = humble_data['# of Stores Selling']
+    growth = humble_data['Dollars, % Chg, Yago']
+    geography = humble_data['GEOGRAPHY']
+
+    # Calculate key metrics
+    total_sales = dollars.sum()
+    avg_growth = growth.mean()
+    avg_acv = humble_data['Max % ACV'].astype(float).mean()
+    promo_sales = humble_data['Dollars, Promo'].sum()
+    promo_pct = (promo_sales / total_sales * 100) if total_sales > 0 else 0
+
+    insights['key_metrics'] = {
+        'total_sales': total_sales,
+        'avg_growth': avg_growth * 100,
+        'avg_acv': avg_acv,
+        'promo_pct': promo_pct
+    }
+
+    # ALERTS - Identify concerning trends
+    if avg_growth < -0.05:
+        insights['alerts'].append({
+            'severity': 'high',
+            'title': 'Declining Sales Trend',
+            'description': f'Sales are down {abs(avg_growth)*100:.1f}% YoY. Immediate action required.',
+            'metric': avg_growth * 100
+        })
+
+    if promo_pct > 50:
+        insights['alerts'].append({
+            'severity': 'medium',
+            'title': 'High Promotional Dependency',
+            'description': f'{promo_pct:.1f}% of sales come from promotions. Risk of margin erosion.',
+            'metric': promo_pct
+        })
+
+    # Check for distribution losses
+    acv_change = humble_data['Max % ACV, +/- Chg, Yago']
+    declining_acv = acv_change < -5
+    for geo, change in zip(geography[declining_acv], acv_change[declining_acv]):
+        insights['alerts'].append({
+            'severity': 'high',
+            'title': f'Distribution Loss at {geo}',
+            'description': f'ACV dropped by {abs(change):.1f} points.',
+            'metric': change
+        })
+
+    # OPPORTUNITIES - Identify growth opportunities
+    high_growth_retailers = humble_data[growth > 0.15].sort_values('Dollars, % Chg, Yago', ascending=False).head(3)
+    for geo, geo_growth in zip(high_growth_retailers['GEOGRAPHY'], high_growth_retailers['Dollars, % Chg, Yago']):
+        insights['opportunities'].append({
+            'title': f'Strong Growth at {geo}',
+            'description': f'Sales up {geo_growth*100:.1f}% YoY. Consider increasing investment.',
+            'metric': geo_growth * 100,
+            'action': f'Expand distribution or promotional support at {geo}'
+        })
+
+    # Low ACV but high sales velocity = opportunity
+    acv = pd.to_numeric(humble_data['Max % ACV'], errors='coerce')
+    velocity = (units / stores.where(stores > 0)).where(stores > 0, 0)
+    overall_velocity = units.sum() / stores.sum()
+    distribution_gap = (acv < 50) & (dollars > dollars.median()) & (velocity > overall_velocity)
+    for geo, geo_velocity, geo_acv in zip(geography[distribution_gap], velocity[distribution_gap], acv[distribution_gap]):
+        insights['opportunities'].append({
+            'title': f'Distribution Gap at {geo}',
+            'description': f'Strong velocity ({geo_velocity:.1f} units/store) but only {geo_acv:.1f}% ACV.',
+            'metric': geo_acv,
+            'action': f'Negotiate expanded distribution at {geo}'
+        })
+
+    # THREATS - Competitive analysis
+    if competitor_index is None:
+        competitor_index = CompetitorIndex(filtered_df)
+    threats = _competitor_threats(competitor_index, humble_data, avg_growth)
+    for brand, geo, comp_growth in zip(threats['DESCRIPTION'], threats['GEOGRAPHY'], threats['Dollars, % Chg, Yago']):
+        insights['threats'].append({
+            'title': f'{brand} Gaining Share',
+            'description': f'Growing {comp_growth*100:.1f}% YoY at {geo}, faster than HUMBLE.',
+            'metric': comp_growth * 100,
+            'competitor': brand
+        })
+
+    # RECOMMENDATIONS
+    # 1. Retailer prioritization - score based on sales and growth
+    score_growth = growth.fillna(0)
+    scores = np.select(
+        [score_growth > 0.10, score_growth > 0, score_growth < -0.10],
+        [3, 1, -2],
+        default=0
+    ) + np.where(dollars > dollars.quantile(0.75), 2, 0)
+
+    # Stable sort keeps sheet order within equal scores
+    ranked = np.argsort(-scores, kind='stable')
+    ranked_geos = geography.to_numpy()[ranked]
+    ranked_sales = dollars.to_numpy()[ranked]
+    ranked_growth = score_growth.to_numpy()[ranked] * 100
+
+    # Top priority retailers
+    insights['recommendations'].append({
+        'category': 'Retailer Focus',
+        'priority': 'high',
+        'title': 'Prioritize High-Performance Retailers',
+        'actions': [f"{geo}: ${sales:,.0f} sales, {geo_growth:.1f}% growth"
+                    for geo, sales, geo_growth in zip(ranked_geos[:3], ranked_sales[:3], ranked_growth[:3])],
+        'rationale': 'These retailers show strong performance and growth momentum.'
+    })
+
+    # Declining retailers need attention
+    declining = ranked_growth < -5
+    if declining.any():
+        insights['recommendations'].append({
+            'category': 'Retailer Risk',
+            'priority': 'high',
+            'title': 'Address Declining Retailers',
+            'actions': [f"{geo}: {geo_growth:.1f}% decline"
+                        for geo, geo_growth in zip(ranked_geos[declining][:3], ranked_growth[declining][:3])],
+            'rationale': 'Immediate intervention needed to reverse negative trends.'
+        })
+
+    # 2. Promotional strategy
+    if promo_pct > 40:
+        insights['recommendations'].append({
+            'category': 'Promotional Strategy',
+            'priority': 'medium',
+            'title': 'Reduce Promotional Dependency',
+            'actions': [
+                f'Current promo mix: {promo_pct:.1f}% (Target: 25-35%)',
+                'Improve everyday shelf presence and visibility',
+                'Test premium positioning at select retailers'
+            ],
+            'rationale': 'High promotional dependency erodes margins and brand equity.'
+        })
+    elif promo_pct < 20:
+        insights['recommendations'].append({
+            'category': 'Promotional Strategy',
+            'priority': 'low',
+            'title': 'Consider Increased Promotional Activity',
+            'actions': [
+                f'Current promo mix: {promo_pct:.1f}%',
+                'Test targeted promotions at underperforming retailers',
+                'Trial sampling programs to drive awareness'
+            ],
+            'rationale': 'Limited promotional activity may be leaving sales on the table.'
+        })
+
+    # 3. Distribution expansion
+    low_acv_retailers = humble_data[humble_data['Max % ACV'].astype(float) < 50].head(3)
+    if not low_acv_retailers.empty:
+        insights['recommendations'].append({
+            'category': 'Distribution',
+            'priority': 'medium',
+            'title': 'Expand Distribution Coverage',
+            'actions': [f"{geo}: {geo_acv:.1f}% ACV"
+                        for geo, geo_acv in zip(low_acv_retailers['GEOGRAPHY'], pd.to_numeric(low_acv_retailers['Max % ACV'], errors='coerce'))],
+            'rationale': 'Low ACV indicates significant white space opportunity.'
+        })
+
+    return insights
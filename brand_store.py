@@ -0,0 +1,244 @@
+"""
+SPINS Brand Row Store
+Keeps the latest Raw sheets of the brand and retailers and trend workbooks in
+spins_brand_store.db, one row per (DESCRIPTION, GEOGRAPHY, TIME FRAME), so
+weekly updates only write the rows that changed
+"""
+
+import json
+import sqlite3
+from datetime import date, datetime
+
+import pandas as pd
+
+from config import BRAND_STORE_FILE
+
+KEY_COLUMNS = ['DESCRIPTION', 'GEOGRAPHY', 'TIME FRAME']
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# Raw sheets of the brand and retailers workbook, and of the trend workbook
+ROW_TABLES = ['brand_rows', 'trend_rows']
+
+
+def get_connection(db_path=BRAND_STORE_FILE):
+    """Open the brand store, creating its tables if needed"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    key_defs = ", ".join(f"{_quote(col)} TEXT NOT NULL" for col in KEY_COLUMNS)
+    for table in ROW_TABLES:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key_defs},
+                PRIMARY KEY ({', '.join(_quote(col) for col in KEY_COLUMNS)})
+            )
+        """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS brand_updates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            updated_at TEXT NOT NULL,
+            source_file TEXT,
+            added INTEGER,
+            changed INTEGER,
+            removed INTEGER,
+            unchanged INTEGER,
+            report TEXT
+        )
+    """)
+
+    # table_name tells brand and trend updates apart; added to stores created before trend rows
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(brand_updates)")]
+    if 'table_name' not in columns:
+        conn.execute("ALTER TABLE brand_updates ADD COLUMN table_name TEXT DEFAULT 'brand_rows'")
+    return conn
+
+
+def _store_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+
+
+def _column_types(conn, table, new):
+    """SQLite type of each column of new: as stored, or as it will be added"""
+    declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA main.table_info({table})")}
+    return {
+        col: declared.get(col) or ('REAL' if pd.api.types.is_numeric_dtype(new[col]) else 'TEXT')
+        for col in new.columns
+    }
+
+
+def _sql_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _sql_values(df):
+    """df as the Python values written to SQLite: None for missing, ISO text for dates"""
+    values = df.astype(object).where(df.notna(), None)
+    for col in values.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            values[col] = values[col].map(_sql_value)
+    return values
+
+
+def _as_stored(new, column_types):
+    """new as the store would read it back, so unchanged rows compare equal
+
+    Numeric columns stored as REAL read back as they are. Others can change
+    on the way: numbers in a TEXT column become text, text that looks numeric
+    in a REAL column becomes a number, and dates become ISO text. They are
+    passed through an in-memory table of the same column types.
+    """
+    columns = [
+        col for col in new.columns if col not in KEY_COLUMNS
+        and not (column_types[col] == 'REAL' and pd.api.types.is_numeric_dtype(new[col]))
+    ]
+    if not columns:
+        return new
+
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute(f"CREATE TABLE rows ({', '.join(f'{_quote(col)} {column_types[col]}' for col in columns)})")
+        conn.executemany(
+            f"INSERT INTO rows VALUES ({', '.join('?' for _ in columns)})",
+            _sql_values(new[columns]).itertuples(index=False, name=None)
+        )
+        stored = pd.read_sql_query("SELECT * FROM rows ORDER BY rowid", conn)
+    finally:
+        conn.close()
+
+    new = new.copy()
+    for col in columns:
+        new[col] = stored[col].to_numpy()
+    return new
+
+
+def load_brand_rows(db_path=BRAND_STORE_FILE, table='brand_rows'):
+    """Every stored Raw row as a DataFrame, in the column order of the sheets loaded"""
+    conn = get_connection(db_path)
+    try:
+        return pd.read_sql_query(f"SELECT * FROM {table}", conn)
+    finally:
+        conn.close()
+
+
+def diff_brand_rows(old, new):
+    """Compare two Raw frames on KEY_COLUMNS
+
+    Returns (added, changed, removed, unchanged) key indexes. A row has changed
+    when any column of the new sheet differs, with NaN equal to NaN and columns
+    missing from the old rows counting as NaN.
+    """
+    new_rows = new.set_index(KEY_COLUMNS)
+    old_rows = old.set_index(KEY_COLUMNS)
+
+    added = new_rows.index.difference(old_rows.index, sort=False)
+    removed = old_rows.index.difference(new_rows.index, sort=False)
+    common = new_rows.index.intersection(old_rows.index, sort=False)
+
+    current = new_rows.loc[common]
+    previous = old_rows.reindex(index=common, columns=new_rows.columns)
+    same = (current == previous) | (current.isna() & previous.isna())
+    row_same = same.all(axis=1).to_numpy()
+
+    return added, common[~row_same], removed, common[row_same]
+
+
+def _per_time_frame(keys):
+    counts = pd.Series(keys.get_level_values('TIME FRAME')).value_counts()
+    return {time_frame: int(count) for time_frame, count in counts.items()}
+
+
+def apply_raw_rows(conn, new, source_file=None, table='brand_rows', remove_missing=True):
+    """Write the new and changed rows of a Raw frame inside the caller's transaction
+
+    Rows sharing a key keep the last occurrence, as the sheet lists them. With
+    remove_missing, stored rows the frame no longer has are deleted; without
+    it only the frame's time frames are compared, which suits loading many
+    reports that each cover different periods. Returns a change report dict,
+    which is also logged in the brand_updates table.
+    """
+    new = new.dropna(subset=KEY_COLUMNS)
+    duplicates = int(new.duplicated(subset=KEY_COLUMNS, keep='last').sum())
+    new = new.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+    new = new.astype({col: str for col in KEY_COLUMNS})
+
+    if remove_missing:
+        old = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+    else:
+        time_frames = list(new['TIME FRAME'].unique())
+        old = pd.read_sql_query(
+            f"SELECT * FROM {table} WHERE {_quote('TIME FRAME')} IN ({', '.join('?' for _ in time_frames)})",
+            conn, params=time_frames
+        )
+    column_types = _column_types(conn, table, new)
+    added, changed, removed, unchanged = diff_brand_rows(old, _as_stored(new, column_types))
+    if not remove_missing:
+        removed = removed[:0]
+
+    report = {
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'source_file': source_file,
+        'table': table,
+        'rows': len(new),
+        'added': len(added),
+        'changed': len(changed),
+        'removed': len(removed),
+        'unchanged': len(unchanged),
+        'duplicate_keys': duplicates,
+        'time_frames': {
+            'added': _per_time_frame(added),
+            'changed': _per_time_frame(changed),
+            'removed': _per_time_frame(removed),
+        },
+    }
+
+    # New sheet columns are added to the store as they appear, and
+    # columns the sheet no longer has are emptied so stored rows match it
+    stored_columns = _store_columns(conn, table)
+    for col in new.columns:
+        if col not in stored_columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {_quote(col)} {column_types[col]}")
+    dropped = [col for col in stored_columns if col not in new.columns]
+    if dropped and remove_missing:
+        conn.execute(f"UPDATE {table} SET {', '.join(f'{_quote(col)} = NULL' for col in dropped)}")
+
+    upserts = new.set_index(KEY_COLUMNS).loc[added.append(changed)].reset_index()
+    if len(upserts):
+        columns = list(upserts.columns)
+        updates = ", ".join(f"{_quote(col)} = excluded.{_quote(col)}" for col in columns if col not in KEY_COLUMNS)
+        values = _sql_values(upserts)
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(_quote(col) for col in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT({', '.join(_quote(col) for col in KEY_COLUMNS)}) DO UPDATE SET {updates}",
+            values.itertuples(index=False, name=None)
+        )
+
+    if len(removed):
+        conn.executemany(
+            f"DELETE FROM {table} WHERE {' AND '.join(f'{_quote(col)} = ?' for col in KEY_COLUMNS)}",
+            list(removed)
+        )
+
+    conn.execute(
+        "INSERT INTO brand_updates (updated_at, source_file, table_name, added, changed, removed, unchanged, report) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (report['updated_at'], source_file, table, report['added'], report['changed'],
+         report['removed'], report['unchanged'], json.dumps(report))
+    )
+    return report
+
+
+def update_brand_store(new, source_file=None, db_path=BRAND_STORE_FILE, table='brand_rows'):
+    """Bring one stored Raw sheet in line with a new one, in a single transaction"""
+    conn = get_connection(db_path)
+    try:
+        with conn:
+            return apply_raw_rows(conn, new, source_file, table)
+    finally:
+        conn.close()
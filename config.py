@@ -3,9 +3,23 @@ Dashboard Configuration
 Modify these settings to customize the dashboard behavior
 """
 
+import os
+
 # Data file paths
 BRAND_DATA_FILE = "SPINs Brand and Retailers_110225.xlsx"
 TREND_DATA_FILE = "SPINs Humble_Trended Sale_100525.xlsx"
+POWERTABS_DATA_FILE = "SPINS PowerTabs - Entire Report.xlsx"
+# Report history database, created with its schema on first use. Set
+# SPINS_HISTORY_DB to move it; relative paths are taken from this folder
+HISTORY_DB_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.environ.get('SPINS_HISTORY_DB', 'spins_history.db'),
+)
+# Report history is only saved when the sidebar switch is on; this is its default
+SAVE_REPORT_HISTORY = False
+# Saved report snapshots older than this are deleted
+HISTORY_RETENTION_DAYS = 730
+BRAND_STORE_FILE = "spins_brand_store.db"
 
 # Dashboard settings
 DASHBOARD_TITLE = "SPINS Marketing Intelligence Dashboard"
@@ -39,6 +53,11 @@ CURRENCY_FORMAT = "${:,.0f}"
 PERCENT_FORMAT = "{:.1f}%"
 NUMBER_FORMAT = "{:,.0f}"
 DECIMAL_FORMAT = "{:.2f}"
+PERCENT_CHANGE_FORMAT = "{:+.1f}%"
+PRICE_FORMAT = "${:.2f}"
+MILLIONS_CURRENCY_FORMAT = "${:.2f}M"
+THOUSANDS_FORMAT = "{:.1f}K"
+ONE_DECIMAL_FORMAT = "{:.1f}"
 
 # Key metrics to display
 KEY_METRICS = [
@@ -59,6 +78,7 @@ FOOD_CHANNEL = "TOTAL US - FOOD"
 # Trend analysis settings
 DEFAULT_TREND_CHANNELS = [NATURAL_CHANNEL]
 TREND_PERIOD_TYPE = "12 Weeks"  # Rolling period type in trend data
+HISTORY_TREND_PERIODS = 24  # Saved report snapshots shown on Historical Trends
 
 # Promotional analysis thresholds
 HIGH_PROMO_THRESHOLD = 40  # % above which is considered high promotional activity
@@ -69,9 +89,43 @@ HIGH_GROWTH_THRESHOLD = 20  # % YoY growth
 MODERATE_GROWTH_THRESHOLD = 10
 DECLINE_THRESHOLD = 0
 
+# Retailer scorecard: Performance Score weights (normalized to sum to 1)
+SCORECARD_SALES_WEIGHT = 0.7
+SCORECARD_GROWTH_WEIGHT = 0.3
+SCORECARD_GROWTH_CAP = 0.5  # YoY growth beyond +/-50% scores the same as +/-50%
+
+# Store brand data dimensions as categoricals and downcast measures where lossless
+COMPACT_BRAND_DATA = True
+
 # Data validation settings
 REQUIRED_BRAND_SHEETS = ['Raw', 'Pivot']
 REQUIRED_TREND_SHEETS = ['Raw']
+REQUIRED_RAW_COLUMNS = ['DESCRIPTION', 'GEOGRAPHY', 'TIME FRAME', 'Dollars', 'Units']
+
+# Parsed PowerTabs sheets are cached here as Feather files keyed by content hash.
+# Set SPINS_POWERTABS_CACHE_DIR to move it; relative paths are taken from this folder
+POWERTABS_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.environ.get('SPINS_POWERTABS_CACHE_DIR', '.powertabs_cache'),
+)
+# Cached workbooks unused for this long are deleted, then the least recently
+# used ones until the cache fits in the size limit
+POWERTABS_CACHE_MAX_AGE_DAYS = 30
+POWERTABS_CACHE_MAX_MB = 2048
+# Memory budget for parsed workbooks shared by all sessions in one server process
+POWERTABS_MEMORY_CACHE_MB = 1024
+# Most workbooks kept in that cache, however small
+POWERTABS_MEMORY_CACHE_ENTRIES = 16
+# Worker processes used to parse several uploaded reports at once
+PARALLEL_LOAD_WORKERS = 4
+# Seconds between sidebar refreshes while uploaded reports parse in the background
+LOAD_STATUS_REFRESH_SECONDS = 1.0
+# Plotly figures kept for reuse across reruns and sessions
+FIGURE_CACHE_ENTRIES = 256
+
+# Per-rerun stage timings in the sidebar; also enabled per session with ?timing=1
+RERUN_TIMING = False
+RERUN_TIMING_LOG = "spins_rerun_timings.jsonl"
 
 # Archive settings
 ARCHIVE_FOLDER = "archive"
@@ -0,0 +1,88 @@
+"""
+SPINS Data Archive
+Content-addressed archive of data files: each distinct file is stored once as a
+gzip blob named by its SHA-256, and index.csv records every (hash, original
+name) pair with when it was first archived
+"""
+
+import csv
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from config import ARCHIVE_FOLDER
+from file_hash import file_sha256
+
+INDEX_FILE = "index.csv"
+INDEX_COLUMNS = ['hash', 'original_name', 'ingested_at', 'size_bytes', 'stored_bytes']
+
+
+def _blob_path(file_hash, archive_dir):
+    return os.path.join(archive_dir, "blobs", file_hash[:2], f"{file_hash}.gz")
+
+
+def load_archive_index(archive_dir=ARCHIVE_FOLDER):
+    """Index rows as dicts, oldest first"""
+    index_path = os.path.join(archive_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def _append_index(row, archive_dir):
+    index_path = os.path.join(archive_dir, INDEX_FILE)
+    new_index = not os.path.exists(index_path)
+    with open(index_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=INDEX_COLUMNS)
+        if new_index:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def archive_file(file_path, archive_dir=ARCHIVE_FOLDER):
+    """Archive a file unless identical content is already stored
+
+    Returns (file_hash, stored) where stored is False when the blob already
+    existed. A file seen before under a new name only adds an index row.
+    """
+    file_hash = file_sha256(file_path)
+    original_name = os.path.basename(file_path)
+    blob_path = _blob_path(file_hash, archive_dir)
+
+    stored = not os.path.exists(blob_path)
+    if stored:
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Compress to a temp file first so a partial blob is never mistaken for a stored one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path), prefix='.tmp_')
+        try:
+            with open(file_path, 'rb') as src, os.fdopen(fd, 'wb') as raw, gzip.GzipFile(original_name, 'wb', fileobj=raw) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(tmp_path, blob_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    indexed = any(
+        row['hash'] == file_hash and row['original_name'] == original_name
+        for row in load_archive_index(archive_dir)
+    )
+    if not indexed:
+        _append_index({
+            'hash': file_hash,
+            'original_name': original_name,
+            'ingested_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'size_bytes': os.path.getsize(file_path),
+            'stored_bytes': os.path.getsize(blob_path),
+        }, archive_dir)
+
+    return file_hash, stored
+
+
+def restore_archived_file(file_hash, dest_path, archive_dir=ARCHIVE_FOLDER):
+    """Decompress an archived blob to dest_path"""
+    with gzip.open(_blob_path(file_hash, archive_dir), 'rb') as src, open(dest_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    return dest_path
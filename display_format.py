@@ -0,0 +1,58 @@
+"""
+SPINS Display Formatting
+Turns the metric format strings in config.py into st.dataframe column_config
+entries, so tables keep numeric values and the browser formats every cell
+"""
+
+import re
+
+import pandas as pd
+import streamlit as st
+
+# A config format string: optional prefix, one str.format field, optional suffix
+_FORMAT_PATTERN = re.compile(
+    r'^(?P<prefix>[^{}]*)\{:(?P<sign>[+ ]?)(?P<grouping>,?)(?:\.(?P<precision>\d+))?(?P<kind>[fd])\}(?P<suffix>[^{}]*)$'
+)
+
+
+def number_column(fmt, label=None):
+    """NumberColumn that displays values the way fmt.format(value) would
+
+    Thousands separators need one of Streamlit's locale-aware presets, so only
+    plain and $-prefixed grouped formats are supported; everything else maps to
+    a printf format.
+    """
+    match = _FORMAT_PATTERN.match(fmt)
+    if match is None:
+        raise ValueError(f"Unsupported display format: {fmt!r}")
+
+    prefix, suffix = match['prefix'], match['suffix']
+    precision = int(match['precision'] or 0)
+
+    if match['grouping']:
+        if match['sign'] or suffix or prefix not in ('', '$'):
+            raise ValueError(f"Unsupported display format: {fmt!r}")
+        # Presets take their decimal places from step
+        preset = 'dollar' if prefix == '$' else 'localized'
+        return st.column_config.NumberColumn(label, format=preset, step=10 ** -precision)
+
+    spec = f"%{match['sign']}.{precision}f" if match['kind'] == 'f' else f"%{match['sign']}d"
+    printf = prefix.replace('%', '%%') + spec + suffix.replace('%', '%%')
+    return st.column_config.NumberColumn(label, format=printf)
+
+
+def format_table(df, formats):
+    """Prepare a table for st.dataframe with column formats from config.py
+
+    formats maps a column name to a format string, or to (format, scale) where
+    the column is multiplied by scale first, e.g. (PERCENT_FORMAT, 100) for
+    fractions. Returns the scaled copy of df and its column_config.
+    """
+    table = df.copy()
+    column_config = {}
+    for col, fmt in formats.items():
+        fmt, scale = fmt if isinstance(fmt, tuple) else (fmt, 1)
+        values = pd.to_numeric(table[col], errors='coerce')
+        table[col] = values * scale if scale != 1 else values
+        column_config[col] = number_column(fmt)
+    return table, column_config
@@ -0,0 +1,19 @@
+"""
+SPINS File Hashing
+Content hashes that key the sidecar cache, the parsed-workbook cache and the
+archive; standard library only, so the updater can import it without pandas
+"""
+
+import hashlib
+
+
+def file_sha256(file_source):
+    """SHA-256 of a workbook given as a path or an uploaded file object"""
+    digest = hashlib.sha256()
+    if hasattr(file_source, 'getvalue'):
+        digest.update(file_source.getvalue())
+    else:
+        with open(file_source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
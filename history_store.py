@@ -0,0 +1,135 @@
+"""
+SPINS Historical Snapshot Store
+Keeps one row of 52-week headline metrics per PowerTabs report in spins_history.db
+so month-over-month trends don't need every past workbook re-uploaded. The
+database is local data, created with its schema on first use
+"""
+
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from config import HISTORY_DB_FILE, HISTORY_RETENTION_DAYS
+
+SNAPSHOT_COLUMNS = [
+    'upload_date', 'data_period', 'period_end', 'sales_52w', 'sales_growth_52w',
+    'units_52w', 'units_growth_52w', 'retailer_count', 'top_retailer', 'top_retailer_sales'
+]
+
+
+def get_connection(db_path=HISTORY_DB_FILE):
+    """Open the history database, creating the table and indexes if needed"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS historical_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upload_date TEXT NOT NULL,
+            data_period TEXT,
+            sales_52w REAL,
+            sales_growth_52w REAL,
+            units_52w REAL,
+            units_growth_52w REAL,
+            retailer_count INTEGER,
+            top_retailer TEXT,
+            top_retailer_sales REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(data_period)
+        )
+    """)
+
+    # period_end lets trends sort chronologically; added to databases created before it existed
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(historical_snapshots)")]
+    if 'period_end' not in columns:
+        conn.execute("ALTER TABLE historical_snapshots ADD COLUMN period_end TEXT")
+
+    # data_period is already indexed by its UNIQUE constraint
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_upload_date ON historical_snapshots(upload_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_period_end ON historical_snapshots(period_end)")
+    return conn
+
+
+def parse_data_period(period_info):
+    """Split PowerTabs period info into the period label and its ISO end date"""
+    if not period_info:
+        return None, None
+
+    data_period = str(period_info).split('|')[0].replace('Period:', '').strip() or None
+
+    period_end = None
+    match = re.search(r'(\d{1,2}/\d{1,2}/\d{4})', str(period_info))
+    if match:
+        period_end = datetime.strptime(match.group(1), '%m/%d/%Y').strftime('%Y-%m-%d')
+
+    return data_period, period_end
+
+
+def upsert_snapshot(conn, summary, table='historical_snapshots'):
+    """Insert or refresh one snapshot row inside the caller's transaction
+
+    Returns False when the report has no period to key the row on.
+    """
+    data_period, period_end = parse_data_period(summary.get('period_info'))
+    if data_period is None:
+        return False
+
+    row = {
+        'upload_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'data_period': data_period,
+        'period_end': period_end,
+        'sales_52w': summary['sales_52w'],
+        'sales_growth_52w': summary['sales_growth_52w'],
+        'units_52w': summary['units_52w'],
+        'units_growth_52w': summary['units_growth_52w'],
+        'retailer_count': summary['retailer_count'],
+        'top_retailer': summary.get('top_retailer'),
+        'top_retailer_sales': summary.get('top_retailer_sales'),
+    }
+
+    placeholders = ", ".join(f":{col}" for col in SNAPSHOT_COLUMNS)
+    updates = ", ".join(f"{col} = excluded.{col}" for col in SNAPSHOT_COLUMNS if col != 'data_period')
+    conn.execute(
+        f"INSERT INTO {table} ({', '.join(SNAPSHOT_COLUMNS)}) VALUES ({placeholders}) "
+        f"ON CONFLICT(data_period) DO UPDATE SET {updates}",
+        row
+    )
+    return True
+
+
+def delete_expired_snapshots(conn, retention_days=HISTORY_RETENTION_DAYS, table='historical_snapshots'):
+    """Delete snapshots last saved more than retention_days ago; returns how many"""
+    cutoff = (datetime.now() - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+    return conn.execute(f"DELETE FROM {table} WHERE upload_date < ?", (cutoff,)).rowcount
+
+
+def save_snapshot(summary, db_path=HISTORY_DB_FILE):
+    """Insert or refresh the snapshot row for one report summary
+
+    summary is the dict from powertabs_loader.summarize_powertabs_data. Snapshots
+    past HISTORY_RETENTION_DAYS are deleted in the same transaction. Returns
+    False when the report has no period to key the row on.
+    """
+    conn = get_connection(db_path)
+    try:
+        with conn:
+            delete_expired_snapshots(conn)
+            return upsert_snapshot(conn, summary)
+    finally:
+        conn.close()
+
+
+def load_snapshots(limit=None, db_path=HISTORY_DB_FILE):
+    """Most recent snapshots in chronological order, as a DataFrame"""
+    query = f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM historical_snapshots ORDER BY period_end DESC, upload_date DESC"
+    params = ()
+    if limit is not None:
+        query += " LIMIT ?"
+        params = (limit,)
+
+    conn = get_connection(db_path)
+    try:
+        snapshots = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+    return snapshots.iloc[::-1].reset_index(drop=True)
@@ -0,0 +1,649 @@
+"""
+PowerTabs Workbook Cache
+Parsed PowerTabs sheets are keyed by the workbook's content hash and kept in a
+process-wide LRU shared by all sessions, backed by per-sheet Arrow/Feather
+sidecar files so restarts and redeploys skip the XLSX parse. Sheets are only
+parsed when a page first reads them, or ahead of time in background worker
+processes, and sessions asking for the same sheet at the same time share a
+single parse
+"""
+
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from config import (
+    PARALLEL_LOAD_WORKERS,
+    POWERTABS_CACHE_DIR,
+    POWERTABS_CACHE_MAX_AGE_DAYS,
+    POWERTABS_CACHE_MAX_MB,
+    POWERTABS_DATA_FILE,
+    POWERTABS_MEMORY_CACHE_ENTRIES,
+    POWERTABS_MEMORY_CACHE_MB,
+)
+from file_hash import file_sha256
+from powertabs_loader import (
+    POWERTABS_SHEETS,
+    SUMMARY_SHEETS,
+    iter_powertabs_sheets,
+    parse_workbook_bytes,
+    read_powertabs_workbook,
+    summarize_powertabs_data,
+    summarize_workbook_bytes,
+)
+from shared_data import read_only
+
+# Bump when sheet cleaning or the sidecar layout changes so stale sidecars are ignored
+CACHE_FORMAT_VERSION = 2
+
+# Where sidecars are read and written; change it to point this process elsewhere
+sidecar_dir = POWERTABS_CACHE_DIR
+
+
+def _cache_path(file_hash, cache_dir=None):
+    return os.path.join(cache_dir or sidecar_dir, f"v{CACHE_FORMAT_VERSION}_{file_hash}")
+
+
+def has_cached_sheet(file_hash, key, cache_dir=None):
+    return os.path.exists(os.path.join(_cache_path(file_hash, cache_dir), f"{key}.json"))
+
+
+def load_cached_sheet(file_hash, key, cache_dir=None):
+    """Memory-map one sheet's sidecar as (DataFrame, period_info), or None on a miss"""
+    path = _cache_path(file_hash, cache_dir)
+    meta_file = os.path.join(path, f"{key}.json")
+    if not os.path.exists(meta_file):
+        return None
+
+    try:
+        with open(meta_file) as f:
+            meta = json.load(f)
+        df = feather.read_table(os.path.join(path, f"{key}.feather"), memory_map=True).to_pandas()
+        # Feather needs string column names; restore the workbook headers
+        df.columns = meta['columns']
+        df.attrs.update(meta.get('attrs') or {})
+        # The directory's mtime is its last use for prune_sidecars
+        os.utime(path)
+        return df, meta.get('period_info')
+    except Exception:
+        # A damaged sidecar is treated as a miss and rebuilt from the workbook
+        return None
+
+
+def save_cached_sheet(file_hash, key, df, period_info=None, cache_dir=None):
+    """Write one parsed sheet to a Feather sidecar; returns False if it can't be cached
+
+    The .json written last marks the sheet complete, so readers never see a
+    half-written sidecar.
+    """
+    path = _cache_path(file_hash, cache_dir)
+    if has_cached_sheet(file_hash, key, cache_dir):
+        return True
+
+    if not os.path.isdir(path):
+        # Make room for a new workbook, at most once per workbook
+        prune_sidecars(cache_dir, keep=path)
+    tmp_feather = None
+    try:
+        os.makedirs(path, exist_ok=True)
+        fd, tmp_feather = tempfile.mkstemp(dir=path, prefix='.tmp_')
+        os.close(fd)
+        meta = {
+            'columns': [None if isinstance(c, float) and c != c else c for c in df.columns],
+            'period_info': period_info,
+            'attrs': df.attrs,
+        }
+        df = df.reset_index(drop=True)
+        df.columns = [str(i) for i in range(len(df.columns))]
+        df.to_feather(tmp_feather)
+        os.replace(tmp_feather, os.path.join(path, f"{key}.feather"))
+
+        fd, tmp_meta = tempfile.mkstemp(dir=path, prefix='.tmp_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp_meta, os.path.join(path, f"{key}.json"))
+        return True
+    except Exception:
+        # Mixed-type columns can't be stored in Arrow; fall back to parsing each time
+        if tmp_feather and os.path.exists(tmp_feather):
+            os.remove(tmp_feather)
+        return False
+
+
+def prune_sidecars(cache_dir=None, max_age_days=POWERTABS_CACHE_MAX_AGE_DAYS,
+                   max_mb=POWERTABS_CACHE_MAX_MB, keep=None):
+    """Delete cached workbooks that are stale, unused or over the size limit; returns how many
+
+    Workbooks from older cache formats and ones unused for max_age_days go
+    first, then the least recently used until the rest fit in max_mb. keep
+    is a workbook directory to leave alone, e.g. one being written.
+    """
+    cache_dir = cache_dir or sidecar_dir
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if path == keep or not os.path.isdir(path):
+            continue
+        try:
+            size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+            entries.append((os.path.getmtime(path), size, name, path))
+        except OSError:
+            continue
+    entries.sort()
+
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(size for _, size, _, _ in entries)
+    removed = 0
+    for last_used, size, name, path in entries:
+        current = name.startswith(f"v{CACHE_FORMAT_VERSION}_")
+        if current and last_used >= cutoff and total <= max_mb * 1024 * 1024:
+            continue
+        # Another process may be pruning too, so missing files are fine
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one
+
+    The first caller for a key runs the call; callers arriving while it's in
+    flight wait for it and share its result, or its exception. Nothing is
+    kept once the call finishes, so a later call runs again.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        """(future, leader): the leader must finish(key, ...); everyone else waits on future.result()"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    def __contains__(self, key):
+        return key in self._in_flight
+
+    def finish(self, key, result=None, error=None):
+        with self._lock:
+            future = self._in_flight.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, call):
+        future, leader = self.claim(key)
+        if leader:
+            try:
+                result = call()
+            except BaseException as e:
+                # Waiters must never be left blocked, whatever stopped the leader
+                self.finish(key, error=e)
+                raise
+            self.finish(key, result)
+        return future.result()
+
+
+# In-flight sheet loads and summary parses, keyed by content hash
+_sheet_loads = SingleFlight()
+_summary_parses = SingleFlight()
+
+_worker_executor = None
+_worker_lock = threading.Lock()
+
+
+def _worker_pool():
+    """Worker processes for every parse, started on first use and kept for the process's life"""
+    global _worker_executor
+    with _worker_lock:
+        if _worker_executor is None:
+            # spawn keeps workers from inheriting the Streamlit server's threads
+            ctx = multiprocessing.get_context('spawn')
+            max_workers = min(PARALLEL_LOAD_WORKERS, os.cpu_count() or 1)
+            _worker_executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx)
+        return _worker_executor
+
+
+def _submit(worker, *args):
+    """Queue a job on the worker pool, replacing the pool if a crashed worker broke it"""
+    global _worker_executor
+    pool = _worker_pool()
+    try:
+        return pool.submit(worker, *args)
+    except BrokenProcessPool:
+        with _worker_lock:
+            if _worker_executor is pool:
+                _worker_executor = None
+        return _worker_pool().submit(worker, *args)
+
+
+def parse_to_sidecars(file_source, file_hash, sheet_names, cache_dir):
+    """Worker: parse sheets from one workbook handle, writing each sidecar as soon as it's parsed
+
+    file_source is a path or the workbook's bytes, and sidecars are written
+    to cache_dir. Returns a dict with each sheet's 'timings', the 'uncached'
+    (DataFrame, period_info) of sheets whose sidecar couldn't be written, and
+    the 'error' that stopped the parse early, if any; sheets finished before
+    it are kept.
+    """
+    if isinstance(file_source, bytes):
+        file_source = io.BytesIO(file_source)
+    result = {'timings': {}, 'uncached': {}, 'error': None}
+    try:
+        for sheet_name, df, period_info, seconds in iter_powertabs_sheets(file_source, sheet_names):
+            if df is None:
+                continue
+            result['timings'][sheet_name] = seconds
+            if not save_cached_sheet(file_hash, POWERTABS_SHEETS[sheet_name], df, period_info, cache_dir):
+                result['uncached'][sheet_name] = (df, period_info)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _open_source(file_source):
+    """Fresh readable handle, so sessions sharing an upload never share a file position"""
+    if hasattr(file_source, 'getvalue'):
+        return io.BytesIO(file_source.getvalue())
+    return file_source
+
+
+class LazyPowerTabsData(Mapping):
+    """PowerTabs data dict whose sheets are loaded the first time they're read
+
+    Has the same keys as read_powertabs_workbook's dict. Each sheet comes from
+    its sidecar, or is parsed from the workbook and written to one, on first
+    access and is then kept for every later rerun and session, so a page only
+    waits on the sheets it shows.
+    """
+
+    _META_KEYS = ('period_info', 'sheet_timings', 'cache_source', 'file_hash')
+
+    def __init__(self, file_source, file_hash):
+        self.file_source = file_source
+        self.file_hash = file_hash
+        self.sheet_bytes = 0
+        # An upload's bytes stay in memory until every sheet is loaded
+        self.source_bytes = len(file_source.getvalue()) if hasattr(file_source, 'getvalue') else 0
+        self._sheets = {}
+        self._period_info = None
+        self._timings = {}
+        self._sources = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def _store(self, sheet_name, df, period_info, source, seconds):
+        if POWERTABS_SHEETS[sheet_name] in self._sheets:
+            return
+        self._sheets[POWERTABS_SHEETS[sheet_name]] = df
+        if sheet_name == 'Overview':
+            self._period_info = period_info if period_info is not None else ""
+        self._timings[sheet_name] = seconds
+        self._sources[sheet_name] = source
+        self._errors.pop(sheet_name, None)
+        self.sheet_bytes += int(df.memory_usage(deep=True).sum())
+        if len(self._sheets) == len(POWERTABS_SHEETS):
+            # Every sheet is in memory, the workbook itself is no longer needed
+            self.file_source = None
+            self.source_bytes = 0
+
+    @property
+    def nbytes(self):
+        """Memory held: loaded sheets plus the upload while it's still needed"""
+        return self.sheet_bytes + self.source_bytes
+
+    def _read_sheet(self, sheet_name):
+        key = POWERTABS_SHEETS[sheet_name]
+        start = time.perf_counter()
+        cached = load_cached_sheet(self.file_hash, key)
+        if cached is not None:
+            df, period_info = cached
+            source = 'sidecar'
+        else:
+            parsed = read_powertabs_workbook(_open_source(self.file_source), sheets=[sheet_name])
+            df, period_info = parsed[key], parsed.get('period_info')
+            save_cached_sheet(self.file_hash, key, df, period_info)
+            source = 'workbook'
+        loaded = (df, period_info, source, time.perf_counter() - start)
+        with self._lock:
+            self._store(sheet_name, *loaded)
+        return loaded
+
+    def load_sheet(self, sheet_name):
+        """One sheet, loaded once however many sessions ask for it at the same time
+
+        Loads are coalesced by content hash, so a parse failure is raised to
+        every waiting session and the next request tries again.
+        """
+        key = POWERTABS_SHEETS[sheet_name]
+        if key not in self._sheets:
+            if (self.file_hash, key) in _sheet_loads and has_cached_sheet(self.file_hash, key):
+                # A background job has written this sheet and is still parsing later ones
+                self._read_sheet(sheet_name)
+            else:
+                loaded = _sheet_loads.do((self.file_hash, key), lambda: self._read_sheet(sheet_name))
+                # A waiter may hold a different object for the same workbook
+                with self._lock:
+                    self._store(sheet_name, *loaded)
+        return self._sheets[key]
+
+    def load_in_background(self):
+        """Start loading every sheet that isn't in memory yet and return at once
+
+        Sidecars are read straight away. The other sheets are parsed by one
+        worker job that opens the workbook once and writes each sheet's
+        sidecar as soon as it's parsed. The job holds those sheets' load
+        slots, so a page reading one meanwhile waits for it instead of
+        parsing it again.
+        """
+        claimed = []
+        for sheet_name, key in POWERTABS_SHEETS.items():
+            if key not in self._sheets and _sheet_loads.claim((self.file_hash, key))[1]:
+                claimed.append(sheet_name)
+
+        pending = []
+        try:
+            for sheet_name in list(claimed):
+                key = POWERTABS_SHEETS[sheet_name]
+                cached = load_cached_sheet(self.file_hash, key)
+                if cached is None:
+                    pending.append(sheet_name)
+                    continue
+                loaded = (*cached, 'sidecar', 0.0)
+                with self._lock:
+                    self._store(sheet_name, *loaded)
+                claimed.remove(sheet_name)
+                _sheet_loads.finish((self.file_hash, key), loaded)
+            if not pending:
+                return
+            # Paths go to the worker as they are; uploads are sent once as bytes
+            source = self.file_source if isinstance(self.file_source, (str, os.PathLike)) else _file_bytes(self.file_source)
+            job = _submit(parse_to_sidecars, source, self.file_hash, pending, sidecar_dir)
+        except BaseException as e:
+            for sheet_name in claimed:
+                _sheet_loads.finish((self.file_hash, POWERTABS_SHEETS[sheet_name]), error=e)
+            raise
+        job.add_done_callback(partial(self._background_done, pending))
+
+    def _background_done(self, sheet_names, job):
+        try:
+            result = job.result()
+        except Exception as e:
+            result = {'timings': {}, 'uncached': {}, 'error': str(e)}
+
+        for sheet_name in sheet_names:
+            key = POWERTABS_SHEETS[sheet_name]
+            try:
+                if sheet_name in result['uncached']:
+                    df, period_info = result['uncached'][sheet_name]
+                else:
+                    cached = load_cached_sheet(self.file_hash, key)
+                    if cached is None:
+                        raise RuntimeError(result['error'] or "Sheet was not parsed")
+                    df, period_info = cached
+                loaded = (df, period_info, 'workbook', result['timings'].get(sheet_name, 0.0))
+                with self._lock:
+                    self._store(sheet_name, *loaded)
+            except Exception as e:
+                self._errors[sheet_name] = str(e)
+                _sheet_loads.finish((self.file_hash, key), error=e)
+            else:
+                _sheet_loads.finish((self.file_hash, key), loaded)
+
+    def sheet_status(self):
+        """Sheet name -> 'loaded', 'loading', 'waiting' or 'failed: <error>', without loading anything
+
+        A sheet a background job has already written counts as loaded.
+        """
+        status = {}
+        for sheet_name, key in POWERTABS_SHEETS.items():
+            if key in self._sheets:
+                status[sheet_name] = 'loaded'
+            elif (self.file_hash, key) in _sheet_loads:
+                status[sheet_name] = 'loaded' if has_cached_sheet(self.file_hash, key) else 'loading'
+            elif sheet_name in self._errors:
+                status[sheet_name] = f"failed: {self._errors[sheet_name]}"
+            else:
+                status[sheet_name] = 'waiting'
+        return status
+
+    def add_parsed(self, data):
+        """Adopt sheets from a full read_powertabs_workbook parse"""
+        with self._lock:
+            for sheet_name, key in POWERTABS_SHEETS.items():
+                if key in self._sheets:
+                    continue
+                period_info = data.get('period_info') if sheet_name == 'Overview' else None
+                save_cached_sheet(self.file_hash, key, data[key], period_info)
+                self._store(sheet_name, data[key], period_info, 'workbook',
+                            data['sheet_timings'].get(sheet_name, 0.0))
+
+    def is_available(self, sheet_names):
+        """True when every sheet is in memory, has a sidecar or is already loading, i.e. needs no new XLSX parse"""
+        return all(
+            POWERTABS_SHEETS[name] in self._sheets
+            or (self.file_hash, POWERTABS_SHEETS[name]) in _sheet_loads
+            or has_cached_sheet(self.file_hash, POWERTABS_SHEETS[name])
+            for name in sheet_names
+        )
+
+    def __getitem__(self, key):
+        if key == 'period_info':
+            self.load_sheet('Overview')
+            return self._period_info
+        if key == 'sheet_timings':
+            return dict(self._timings)
+        if key == 'cache_source':
+            if self._sources and all(source == 'sidecar' for source in self._sources.values()):
+                return 'sidecar'
+            return 'workbook'
+        if key == 'file_hash':
+            return self.file_hash
+        for sheet_name, sheet_key in POWERTABS_SHEETS.items():
+            if sheet_key == key:
+                # Every caller gets its own view, so no session can change the cached sheet
+                return read_only(self.load_sheet(sheet_name))
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        # Answer without loading anything
+        return key in POWERTABS_SHEETS.values() or key in self._META_KEYS
+
+    def __iter__(self):
+        yield from POWERTABS_SHEETS.values()
+        yield from self._META_KEYS
+
+    def __len__(self):
+        return len(POWERTABS_SHEETS) + len(self._META_KEYS)
+
+
+class ParsedWorkbookCache:
+    """Thread-safe LRU of lazily loaded workbooks keyed by content hash, bounded by memory and count
+
+    Workbooks grow as their sheets load, so the bounds are enforced on every
+    lookup as well as on insert.
+    """
+
+    def __init__(self, max_bytes, max_entries):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_hash):
+        with self._lock:
+            data = self._entries.get(file_hash)
+            if data is not None:
+                self._entries.move_to_end(file_hash)
+                self._trim()
+            return data
+
+    def peek(self, file_hash):
+        """Like get, but without counting as a use"""
+        return self._entries.get(file_hash)
+
+    def _trim(self):
+        # Evict least recently used workbooks, always keeping the newest one
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.total_bytes() > self.max_bytes
+        ):
+            self._entries.popitem(last=False)
+
+    def _insert(self, file_hash, data):
+        self._entries[file_hash] = data
+        self._entries.move_to_end(file_hash)
+        self._trim()
+
+    def put(self, file_hash, data):
+        with self._lock:
+            self._insert(file_hash, data)
+
+    def get_or_add(self, file_hash, data):
+        """The cached workbook for file_hash, adding data first if there isn't one"""
+        with self._lock:
+            if file_hash in self._entries:
+                self._entries.move_to_end(file_hash)
+                self._trim()
+                return self._entries[file_hash]
+            self._insert(file_hash, data)
+            return data
+
+    def evict(self, file_hash):
+        """Drop a single workbook without touching anyone else's entries"""
+        with self._lock:
+            self._entries.pop(file_hash, None)
+
+    def total_bytes(self):
+        return sum(data.nbytes for data in self._entries.values())
+
+    def __contains__(self, file_hash):
+        return file_hash in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# One cache per server process, shared by every session
+workbook_cache = ParsedWorkbookCache(POWERTABS_MEMORY_CACHE_MB * 1024 * 1024, POWERTABS_MEMORY_CACHE_ENTRIES)
+
+
+def load_powertabs_workbook(file_source=None, file_hash=None):
+    """Lazily loaded PowerTabs workbook for a content hash
+
+    Reuses the in-memory LRU entry when there is one. Sheets are read from
+    their columnar sidecars, or parsed from the XLSX, only when first accessed.
+    """
+    if file_source is None:
+        file_source = POWERTABS_DATA_FILE
+    if file_hash is None:
+        file_hash = file_sha256(file_source)
+
+    data = workbook_cache.get(file_hash)
+    if data is None:
+        # Sessions opening the same upload at once must end up with one object
+        data = workbook_cache.get_or_add(file_hash, LazyPowerTabsData(file_source, file_hash))
+    return data
+
+
+def _file_bytes(file_source):
+    if hasattr(file_source, 'getvalue'):
+        return file_source.getvalue()
+    with open(file_source, 'rb') as f:
+        return f.read()
+
+
+# 52-week summaries are tiny, so keep every one we've computed
+_summary_cache = {}
+
+
+def run_in_pool(worker, payloads):
+    """Run worker over payloads on the shared worker pool, in-process for a single file"""
+    if len(payloads) == 1:
+        return [worker(payloads[0])]
+    jobs = [_submit(worker, payload) for payload in payloads]
+    return [job.result() for job in jobs]
+
+
+def load_powertabs_summaries(file_sources, file_hashes, summary_only=True):
+    """52-week summaries for many workbooks, parsing cache misses in parallel
+
+    With summary_only only the Overview and Brand by Retailer sheets are read.
+    Otherwise whole workbooks are parsed and added to the shared caches so they
+    open instantly when selected later. Files that fail to parse give None.
+    """
+    summaries = {}
+    misses = []
+    needed = SUMMARY_SHEETS if summary_only else POWERTABS_SHEETS
+    for file_source, file_hash in zip(file_sources, file_hashes):
+        if file_hash in summaries or file_hash in misses:
+            continue
+        if summary_only and file_hash in _summary_cache:
+            summaries[file_hash] = _summary_cache[file_hash]
+            continue
+
+        data = workbook_cache.get(file_hash) or LazyPowerTabsData(file_source, file_hash)
+        if data.is_available(needed):
+            if not summary_only:
+                workbook_cache.put(file_hash, data)
+            try:
+                # Waits for any of the sheets still loading in the background
+                summaries[file_hash] = summarize_powertabs_data(data)
+            except Exception:
+                summaries[file_hash] = None
+        else:
+            misses.append(file_hash)
+
+    if misses:
+        sources = dict(zip(file_hashes, file_sources))
+        flights = {file_hash: _summary_parses.claim((file_hash, summary_only)) for file_hash in misses}
+        # Files another session is already parsing are waited on rather than parsed again
+        mine = [file_hash for file_hash, (_, leader) in flights.items() if leader]
+        finished = []
+        try:
+            if mine:
+                payloads = [_file_bytes(sources[file_hash]) for file_hash in mine]
+                worker = summarize_workbook_bytes if summary_only else parse_workbook_bytes
+                for file_hash, result in zip(mine, run_in_pool(worker, payloads)):
+                    if not summary_only and result is not None:
+                        data = workbook_cache.get_or_add(file_hash, LazyPowerTabsData(sources[file_hash], file_hash))
+                        data.add_parsed(result)
+                        # Re-insert so the newly parsed sheets count toward the memory limit
+                        workbook_cache.put(file_hash, data)
+                        result = summarize_powertabs_data(data)
+                    _summary_parses.finish((file_hash, summary_only), result)
+                    finished.append(file_hash)
+        except BaseException as e:
+            for file_hash in mine:
+                if file_hash not in finished:
+                    _summary_parses.finish((file_hash, summary_only), error=e)
+            raise
+        for file_hash in misses:
+            summaries[file_hash] = flights[file_hash][0].result()
+
+    for file_hash, summary in summaries.items():
+        if summary is not None:
+            _summary_cache[file_hash] = summary
+
+    return [summaries[file_hash] for file_hash in file_hashes]
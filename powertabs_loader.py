@@ -0,0 +1,199 @@
+"""
+SPINS PowerTabs Loader
+Parses the sheets of a SPINS PowerTabs "Entire Report" workbook into clean DataFrames
+"""
+
+import io
+import time
+
+import pandas as pd
+
+from config import POWERTABS_DATA_FILE
+from workbook_check import check_workbook
+
+# Workbook sheet name -> key used in the dashboard's data dict
+POWERTABS_SHEETS = {
+    'Overview': 'overview',
+    'Brand by Retailer': 'retailers',
+    'Retailer Growth': 'retailer_growth',
+    'Growth Drivers': 'growth_drivers',
+    'Promo Summary': 'promo',
+    'Brand vs. Category': 'category',
+}
+
+# Sheets that are not present in every PowerTabs export
+OPTIONAL_POWERTABS_SHEETS = ['Promo Summary', 'Brand vs. Category']
+
+# Sheets needed for the file-by-file comparison on the Historical Trends page
+SUMMARY_SHEETS = ['Overview', 'Brand by Retailer']
+
+# Row holding each sheet's column headers, 1-based as Excel shows it
+POWERTABS_HEADER_ROW = 4
+
+# Columns the dashboard reads by name; optional sheets are only checked when present
+POWERTABS_REQUIRED_COLUMNS = {
+    'Brand by Retailer': ['Sales', '% Chg'],
+    'Growth Drivers': ['Dollars Chg Due To'],
+    'Promo Summary': ['Promo ID', '% Disc', '$ % Lift', 'U % Lift', '# of Weeks'],
+}
+
+
+def _sheet_table(df_sheet):
+    """Headers are on row 3, data starts on row 4"""
+    table = df_sheet.iloc[4:].copy()
+    table.columns = df_sheet.iloc[3].values
+    return table.reset_index(drop=True)
+
+
+def _clean_overview(df_sheet):
+    return _sheet_table(df_sheet)
+
+
+def _clean_retailers(df_sheet):
+    retailers_data = _sheet_table(df_sheet)
+    for col in ['Sales', 'Absolute Chg', '% Chg']:
+        if col in retailers_data.columns:
+            retailers_data[col] = pd.to_numeric(retailers_data[col], errors='coerce')
+    return retailers_data
+
+
+def _clean_retailer_growth(df_sheet):
+    retailer_growth_data = _sheet_table(df_sheet)
+    numeric_cols = [col for col in retailer_growth_data.columns if col not in ['Top 10 Retailers by Dollar Change', 'Primary Driver of Growth']]
+    for col in numeric_cols:
+        retailer_growth_data[col] = pd.to_numeric(retailer_growth_data[col], errors='coerce')
+    return retailer_growth_data
+
+
+def _clean_growth_drivers(df_sheet):
+    growth_data = _sheet_table(df_sheet)
+    for col in growth_data.columns:
+        if col != 'Driver':
+            growth_data[col] = pd.to_numeric(growth_data[col], errors='coerce')
+    return growth_data
+
+
+def _clean_promo(df_sheet):
+    promo_data = _sheet_table(df_sheet)
+    for col in promo_data.columns:
+        if col != 'Promo Type':
+            promo_data[col] = pd.to_numeric(promo_data[col], errors='coerce')
+    return promo_data
+
+
+def _clean_category(df_sheet):
+    return _sheet_table(df_sheet)
+
+
+SHEET_CLEANERS = {
+    'Overview': _clean_overview,
+    'Brand by Retailer': _clean_retailers,
+    'Retailer Growth': _clean_retailer_growth,
+    'Growth Drivers': _clean_growth_drivers,
+    'Promo Summary': _clean_promo,
+    'Brand vs. Category': _clean_category,
+}
+
+
+def iter_powertabs_sheets(file_source=None, sheets=None):
+    """Open the workbook once and yield each PowerTabs sheet as it's parsed
+
+    Yields (sheet name, cleaned DataFrame, period_info, seconds) in workbook
+    order; period_info is only set for the Overview sheet. The first item is
+    ('(open workbook)', None, None, seconds). Pass sheets to parse a subset.
+    An optional sheet that's missing or too malformed to clean comes back
+    empty, with what went wrong in df.attrs['load_problem'].
+    """
+    file_path = POWERTABS_DATA_FILE if file_source is None else file_source
+
+    start = time.perf_counter()
+    with pd.ExcelFile(file_path) as xl:
+        yield '(open workbook)', None, None, time.perf_counter() - start
+
+        for sheet_name in POWERTABS_SHEETS:
+            if sheets is not None and sheet_name not in sheets:
+                continue
+            start = time.perf_counter()
+            period_info = None
+            if sheet_name in OPTIONAL_POWERTABS_SHEETS and sheet_name not in xl.sheet_names:
+                df = pd.DataFrame()
+            else:
+                df_sheet = xl.parse(sheet_name, header=None)
+                if sheet_name == 'Overview':
+                    # Extract period info from row 1 (0-indexed)
+                    period_info = df_sheet.iloc[1, 0] if len(df_sheet) > 1 else ""
+                try:
+                    df = SHEET_CLEANERS[sheet_name](df_sheet)
+                except (IndexError, KeyError, TypeError, ValueError) as e:
+                    if sheet_name not in OPTIONAL_POWERTABS_SHEETS:
+                        raise
+                    df = pd.DataFrame()
+                    df.attrs['load_problem'] = f"{sheet_name} sheet could not be read: {e}"
+            yield sheet_name, df, period_info, time.perf_counter() - start
+
+
+def read_powertabs_workbook(file_source=None, sheets=None):
+    """Open the workbook once and parse every PowerTabs sheet from the shared handle
+
+    Returns the data dict used by the dashboard. 'sheet_timings' maps each sheet
+    name to the seconds spent parsing and cleaning it. Pass sheets to parse only
+    a subset, e.g. SUMMARY_SHEETS.
+    """
+    data = {}
+    sheet_timings = {}
+    for sheet_name, df, period_info, seconds in iter_powertabs_sheets(file_source, sheets):
+        sheet_timings[sheet_name] = seconds
+        if df is None:
+            continue
+        data[POWERTABS_SHEETS[sheet_name]] = df
+        if sheet_name == 'Overview':
+            data['period_info'] = period_info
+
+    data['sheet_timings'] = sheet_timings
+    return data
+
+
+def check_powertabs_workbook(file_source):
+    """Structural problems that would stop a PowerTabs file loading, empty when it's valid
+
+    Reads only sheet names and header rows, so it's cheap enough to run on
+    every upload before the full parse.
+    """
+    required = [sheet for sheet in POWERTABS_SHEETS if sheet not in OPTIONAL_POWERTABS_SHEETS]
+    return check_workbook(file_source, required, POWERTABS_REQUIRED_COLUMNS, POWERTABS_HEADER_ROW)
+
+
+def summarize_powertabs_data(data):
+    """52-week headline metrics used to compare reports, or None without a 52-week row"""
+    overview = data['overview']
+    week_52 = overview[overview.iloc[:, 0] == '52 Weeks']
+    if week_52.empty:
+        return None
+
+    retailers = data.get('retailers', pd.DataFrame())
+
+    return {
+        'period_info': data.get('period_info', ""),
+        'sales_52w': float(week_52.iloc[0, 1]),
+        'sales_growth_52w': float(week_52.iloc[0, 2]),
+        'units_52w': float(week_52.iloc[0, 3]),
+        'units_growth_52w': float(week_52.iloc[0, 4]),
+        'retailer_count': len(retailers),
+        'top_retailer': str(retailers.iloc[0, 0]) if not retailers.empty else None,
+        'top_retailer_sales': float(retailers.iloc[0, 1]) if not retailers.empty else None,
+    }
+
+
+# Process pool workers take raw bytes since uploaded file objects don't pickle
+def parse_workbook_bytes(file_bytes):
+    try:
+        return read_powertabs_workbook(io.BytesIO(file_bytes))
+    except Exception:
+        return None
+
+
+def summarize_workbook_bytes(file_bytes):
+    try:
+        return summarize_powertabs_data(read_powertabs_workbook(io.BytesIO(file_bytes), sheets=SUMMARY_SHEETS))
+    except Exception:
+        return None
@@ -0,0 +1,172 @@
+"""
+SPINS Rerun Timing
+Opt-in instrumentation of a Streamlit rerun: wall time and peak memory for
+each stage (data load, page computations, figure building, rendering), shown
+in a sidebar panel and appended to a JSONL log
+"""
+
+import json
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from config import ONE_DECIMAL_FORMAT, RERUN_TIMING_LOG
+from display_format import number_column
+
+
+# Sessions currently timing a rerun; tracemalloc runs while there is at least one
+_tracing_users = 0
+_tracing_owned = False
+_tracing_lock = threading.Lock()
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        # Leave tracing alone if something other than a timer started it
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+class RerunTimer:
+    """Records nested stages of one rerun; does nothing when disabled
+
+    Peak memory comes from tracemalloc, which traces the whole process, so
+    reruns of other sessions running at the same time are counted too. Each
+    stage's peak is measured above the memory in use when it started.
+    Tracing is shared by reference count and stops when the last timer is
+    closed; call close() before st.stop() or st.rerun() ends a rerun early.
+    A timer that is never closed, e.g. after an exception, releases tracing
+    when it's garbage collected.
+    """
+
+    def __init__(self, enabled, log_path=RERUN_TIMING_LOG):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.stages = []
+        self._stack = []
+        self._start = time.perf_counter()
+        self._release = None
+        if enabled:
+            _acquire_tracing()
+            self._release = weakref.finalize(self, _release_tracing)
+
+    def begin(self, name, kind, **info):
+        """Start a stage; kind groups stages, e.g. 'load', 'compute', 'figure', 'render'"""
+        if not self.enabled:
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            # reset_peak below would lose the parent's peak so far
+            parent = self._stack[-1]
+            parent['_peak'] = max(parent['_peak'], peak)
+        tracemalloc.reset_peak()
+
+        stage = {
+            'name': name,
+            'kind': kind,
+            'depth': len(self._stack),
+            'info': info,
+            '_start': time.perf_counter(),
+            '_base': current,
+            '_peak': current,
+            '_children_s': 0.0,
+        }
+        self.stages.append(stage)
+        self._stack.append(stage)
+        return stage
+
+    def end(self, stage):
+        if stage is None:
+            return
+        seconds = time.perf_counter() - stage['_start']
+        stage['_peak'] = max(stage['_peak'], tracemalloc.get_traced_memory()[1])
+        stage['seconds'] = seconds
+        stage['self_seconds'] = seconds - stage['_children_s']
+        stage['peak_mb'] = (stage['_peak'] - stage['_base']) / 1e6
+
+        self._stack.remove(stage)
+        if self._stack:
+            parent = self._stack[-1]
+            parent['_children_s'] += seconds
+            parent['_peak'] = max(parent['_peak'], stage['_peak'])
+
+    @contextmanager
+    def stage(self, name, kind, **info):
+        """Time a block; the yielded dict can be updated with details such as cache hits"""
+        stage = self.begin(name, kind, **info)
+        try:
+            yield stage['info'] if stage is not None else info
+        finally:
+            self.end(stage)
+
+    def close(self):
+        """Stop tracing for this rerun; safe to call more than once"""
+        if self._release is not None:
+            self._release()
+
+    def finish(self, **context):
+        """Close the rerun, append it to the JSONL log and return its record (None when disabled)"""
+        if not self.enabled:
+            return None
+        record = {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total_seconds': time.perf_counter() - self._start,
+            **context,
+            'stages': [
+                {key: value for key, value in stage.items() if not key.startswith('_')}
+                for stage in self.stages if 'seconds' in stage
+            ],
+        }
+        self.close()
+
+        try:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            record['log_error'] = str(e)
+        return record
+
+
+def show_timing_panel(container, record):
+    """Collapsible table of a rerun's stages"""
+    with container.container():
+        with st.expander("⏱️ Rerun Timings"):
+            st.caption(f"Total: {record['total_seconds']:.2f}s")
+            table = pd.DataFrame([
+                {
+                    'Stage': "  " * stage['depth'] + stage['name'],
+                    'Kind': stage['kind'],
+                    'Time (ms)': stage['seconds'] * 1000,
+                    'Self (ms)': stage['self_seconds'] * 1000,
+                    'Peak (MB)': stage['peak_mb'],
+                    'Details': ", ".join(f"{key}: {value}" for key, value in stage['info'].items()),
+                }
+                for stage in record['stages']
+            ])
+            st.dataframe(
+                table,
+                column_config={col: number_column(ONE_DECIMAL_FORMAT) for col in ['Time (ms)', 'Self (ms)', 'Peak (MB)']},
+                hide_index=True,
+            )
+            if 'log_error' in record:
+                st.warning(f"Could not write timing log: {record['log_error']}")
+            else:
+                st.caption(f"Logged to {RERUN_TIMING_LOG}")
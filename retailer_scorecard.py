@@ -0,0 +1,55 @@
+"""
+SPINS Retailer Scorecard
+Weighted performance scores, percentile ranks and priority tiers for retailer
+and geography tables, computed with whole-column operations
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import SCORECARD_GROWTH_CAP, SCORECARD_GROWTH_WEIGHT, SCORECARD_SALES_WEIGHT
+
+
+def score_retailers(df, sales_col, growth_col, sales_weight=SCORECARD_SALES_WEIGHT,
+                    growth_weight=SCORECARD_GROWTH_WEIGHT, growth_cap=SCORECARD_GROWTH_CAP):
+    """Copy of df with Sales Score, Growth Score, Performance Score and percentile ranks
+
+    growth_col holds fractional YoY change (0.12 = +12%). Sales score is sales
+    relative to the largest account; growth is capped at +/-growth_cap and
+    mapped to 0-100 with no change at 50. 'Sales Percentile' and 'Growth
+    Percentile' rank each row against the whole table, 0-100.
+    """
+    scorecard = df.copy()
+    sales = pd.to_numeric(scorecard[sales_col], errors='coerce')
+    growth = pd.to_numeric(scorecard[growth_col], errors='coerce')
+
+    max_sales = sales.max()
+    scorecard['Sales Score'] = (sales / max_sales * 100) if max_sales > 0 else 0
+    scorecard['Growth Score'] = growth.clip(-growth_cap, growth_cap) / (2 * growth_cap) * 100 + 50
+
+    total_weight = sales_weight + growth_weight
+    scorecard['Performance Score'] = (
+        scorecard['Sales Score'] * (sales_weight / total_weight)
+        + scorecard['Growth Score'] * (growth_weight / total_weight)
+    )
+
+    scorecard['Sales Percentile'] = sales.rank(pct=True) * 100
+    scorecard['Growth Percentile'] = growth.rank(pct=True) * 100
+    return scorecard
+
+
+def priority_tiers(scores, tiers, default):
+    """Label each score with the first (min_score, label) tier it reaches, else default
+
+    Tiers are checked in order, so list them from the highest threshold down.
+    Missing scores get the default label.
+    """
+    thresholds, labels = zip(*tiers)
+    conditions = [scores >= threshold for threshold in thresholds]
+    return pd.Series(np.select(conditions, labels, default=default), index=scores.index)
+
+
+def weights_label(sales_weight=SCORECARD_SALES_WEIGHT, growth_weight=SCORECARD_GROWTH_WEIGHT):
+    """e.g. '70% Sales Volume + 30% Growth Rate' for the configured weights"""
+    total_weight = sales_weight + growth_weight
+    return f"{sales_weight / total_weight:.0%} Sales Volume + {growth_weight / total_weight:.0%} Growth Rate"
@@ -0,0 +1,22 @@
+"""
+SPINS Shared Data
+Parsed workbooks, brand partitions, trend stores and scorecards are cached
+once per server process and shared by every session. Pages must never change
+them; they work on read-only views instead
+
+Importing this module turns on pandas copy-on-write for the process. Under
+copy-on-write a view shares the cached frame's data until it's modified, and
+any change to the view (new columns, .loc assignment, renamed columns) lands
+in the view's own copy, never in the cached frame. Frames derived from a view
+(column picks, slices, filters) behave the same way, so pages can modify
+them without calling .copy() first.
+"""
+
+import pandas as pd
+
+pd.set_option('mode.copy_on_write', True)
+
+
+def read_only(df):
+    """View of a shared frame for one page; it copies the data only if it's changed"""
+    return df.copy(deep=False)
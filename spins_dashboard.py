@@ -9,6 +9,37 @@ import json
 import io
 from pathlib import Path
 
+import sqlite3
+
+from config import (
+    CURRENCY_FORMAT,
+    FIGURE_CACHE_ENTRIES,
+    HISTORY_DB_FILE,
+    HISTORY_RETENTION_DAYS,
+    HISTORY_TREND_PERIODS,
+    LOAD_STATUS_REFRESH_SECONDS,
+    MILLIONS_CURRENCY_FORMAT,
+    NUMBER_FORMAT,
+    ONE_DECIMAL_FORMAT,
+    PERCENT_CHANGE_FORMAT,
+    PERCENT_FORMAT,
+    POWERTABS_CACHE_MAX_AGE_DAYS,
+    POWERTABS_CACHE_MAX_MB,
+    POWERTABS_DATA_FILE,
+    PRICE_FORMAT,
+    RERUN_TIMING,
+    SAVE_REPORT_HISTORY,
+    THOUSANDS_FORMAT,
+)
+from display_format import format_table
+from file_hash import file_sha256
+from history_store import load_snapshots, save_snapshot
+from powertabs_cache import load_powertabs_summaries, load_powertabs_workbook, workbook_cache
+from powertabs_loader import POWERTABS_SHEETS, check_powertabs_workbook, summarize_powertabs_data
+from rerun_timing import RerunTimer, show_timing_panel
+from retailer_scorecard import priority_tiers, score_retailers, weights_label
+from shared_data import read_only
+
 # Page configuration
 st.set_page_config(
     page_title="SPINS Marketing Intelligence Dashboard",
@@ -19,6 +50,9 @@ st.set_page_config(
 
 # No password protection - data must be uploaded each session anyway
 
+# Opt-in stage timings for this rerun, from config or ?timing=1
+timer = RerunTimer(RERUN_TIMING or st.query_params.get('timing') == '1')
+
 # Custom CSS
 st.markdown("""
     <style>
@@ -46,90 +80,64 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # PowerTabs Data Loading Functions
-@st.cache_data
-def load_powertabs_data(file_source=None):
-    """Load all sheets from SPINS PowerTabs file"""
-
+def get_file_hash(file_source):
+    """Content hash of a PowerTabs file, computed once per uploaded file in this session"""
     if file_source is None:
-        file_path = 'SPINS PowerTabs - Entire Report.xlsx'
+        file_key = f"{POWERTABS_DATA_FILE}@{Path(POWERTABS_DATA_FILE).stat().st_mtime_ns}"
+        file_source = POWERTABS_DATA_FILE
     else:
-        file_path = file_source
+        file_key = file_source.file_id
 
-    data = {}
+    if 'file_hashes' not in st.session_state:
+        st.session_state.file_hashes = {}
+    if file_key not in st.session_state.file_hashes:
+        st.session_state.file_hashes[file_key] = file_sha256(file_source)
+    return st.session_state.file_hashes[file_key]
 
-    try:
-        # Overview - Key metrics by time period
-        df_overview = pd.read_excel(file_path, sheet_name='Overview', header=None)
-        # Extract period info from row 1 (0-indexed)
-        period_info = df_overview.iloc[1, 0] if len(df_overview) > 1 else ""
-        data['period_info'] = period_info
-
-        # Headers are on row 3, data starts on row 4
-        overview_data = df_overview.iloc[4:].copy()
-        overview_data.columns = df_overview.iloc[3].values
-        overview_data = overview_data.reset_index(drop=True)
-        data['overview'] = overview_data
-
-        # Brand by Retailer
-        df_retailers = pd.read_excel(file_path, sheet_name='Brand by Retailer', header=None)
-        retailers_data = df_retailers.iloc[4:].copy()
-        retailers_data.columns = df_retailers.iloc[3].values
-        retailers_data = retailers_data.reset_index(drop=True)
-        # Clean numeric columns
-        for col in ['Sales', 'Absolute Chg', '% Chg']:
-            if col in retailers_data.columns:
-                retailers_data[col] = pd.to_numeric(retailers_data[col], errors='coerce')
-        data['retailers'] = retailers_data
-
-        # Retailer Growth - Detailed metrics
-        df_retailer_growth = pd.read_excel(file_path, sheet_name='Retailer Growth', header=None)
-        retailer_growth_data = df_retailer_growth.iloc[4:].copy()
-        retailer_growth_data.columns = df_retailer_growth.iloc[3].values
-        retailer_growth_data = retailer_growth_data.reset_index(drop=True)
-        # Clean numeric columns
-        numeric_cols = [col for col in retailer_growth_data.columns if col not in ['Top 10 Retailers by Dollar Change', 'Primary Driver of Growth']]
-        for col in numeric_cols:
-            retailer_growth_data[col] = pd.to_numeric(retailer_growth_data[col], errors='coerce')
-        data['retailer_growth'] = retailer_growth_data
-
-        # Growth Drivers
-        df_growth = pd.read_excel(file_path, sheet_name='Growth Drivers', header=None)
-        growth_data = df_growth.iloc[4:].copy()
-        growth_data.columns = df_growth.iloc[3].values
-        growth_data = growth_data.reset_index(drop=True)
-        for col in growth_data.columns:
-            if col != 'Driver':
-                growth_data[col] = pd.to_numeric(growth_data[col], errors='coerce')
-        data['growth_drivers'] = growth_data
-
-        # Promo Summary
-        try:
-            df_promo = pd.read_excel(file_path, sheet_name='Promo Summary', header=None)
-            promo_data = df_promo.iloc[4:].copy()
-            promo_data.columns = df_promo.iloc[3].values
-            promo_data = promo_data.reset_index(drop=True)
-            for col in promo_data.columns:
-                if col != 'Promo Type':
-                    promo_data[col] = pd.to_numeric(promo_data[col], errors='coerce')
-            data['promo'] = promo_data
-        except:
-            data['promo'] = pd.DataFrame()
-
-        # Brand vs Category
-        try:
-            df_category = pd.read_excel(file_path, sheet_name='Brand vs. Category', header=None)
-            category_data = df_category.iloc[4:].copy()
-            category_data.columns = df_category.iloc[3].values
-            category_data = category_data.reset_index(drop=True)
-            data['category'] = category_data
-        except:
-            data['category'] = pd.DataFrame()
+def load_powertabs_data(file_source=None):
+    """Open a SPINS PowerTabs file, parsing each sheet only when a page first needs it
 
-        return data
+    Parsed workbooks are shared across sessions by content hash, so analysts
+    uploading the same report reuse one parse.
+    """
+    with timer.stage("Load PowerTabs workbook", 'load') as load_info:
+        try:
+            file_hash = get_file_hash(file_source)
+            in_memory = file_hash in workbook_cache
+            data = load_powertabs_workbook(file_source, file_hash)
+            # Every page needs the Overview sheet; load it here so a bad file fails early
+            data['overview']
+            load_info['cache'] = 'memory' if in_memory else data['cache_source']
+            return data
+
+        except Exception as e:
+            load_info['error'] = str(e)
+            st.error(f"Error loading PowerTabs data: {e}")
+            return None
+
+def record_snapshot(file_hash, data=None, summary=None):
+    """Write a report's 52-week snapshot to the history database once per session
+
+    Does nothing unless the user has turned on saving report history. Pass
+    the report's summary if it's already built, otherwise its data; the
+    summary is only built from data once a snapshot is actually due.
+    """
+    if not st.session_state.get('save_report_history'):
+        return
+    if 'recorded_snapshots' not in st.session_state:
+        st.session_state.recorded_snapshots = set()
+    if file_hash in st.session_state.recorded_snapshots:
+        return
+    if summary is None and data is not None:
+        summary = summarize_powertabs_data(data)
+    if summary is None:
+        return
 
-    except Exception as e:
-        st.error(f"Error loading PowerTabs data: {e}")
-        return None
+    try:
+        save_snapshot(summary)
+    except sqlite3.Error as e:
+        st.sidebar.warning(f"Could not save report history: {e}")
+    st.session_state.recorded_snapshots.add(file_hash)
 
 # Helper function to extract file label/date
 def get_file_label(uploaded_file):
@@ -141,11 +149,47 @@ def get_file_label(uploaded_file):
     # Just return the filename for now
     return filename
 
+def upload_sheet_status(files):
+    """File label -> {sheet: status} for uploaded reports, without loading anything"""
+    statuses = {}
+    for f in files:
+        data = workbook_cache.peek(get_file_hash(f))
+        statuses[get_file_label(f)] = (
+            data.sheet_status() if data is not None else {sheet_name: 'waiting' for sheet_name in POWERTABS_SHEETS}
+        )
+    return statuses
+
+def is_loading(statuses):
+    return any(status == 'loading' for sheets in statuses.values() for status in sheets.values())
+
+# Sheet status icons for the background load panel
+SHEET_STATUS_ICONS = {'loaded': '✅', 'loading': '⏳', 'waiting': '⏸️'}
+
+def show_load_status(files, refreshing):
+    """Per-file progress and per-sheet status of uploaded reports that aren't fully loaded
+
+    Runs as a fragment that redraws itself while sheets are loading, then
+    reruns the app once so it stops polling.
+    """
+    statuses = upload_sheet_status(files)
+    if refreshing and not is_loading(statuses):
+        st.rerun()
+
+    for file_label, sheets in statuses.items():
+        loaded = sum(status == 'loaded' for status in sheets.values())
+        if loaded == len(POWERTABS_SHEETS):
+            continue
+        st.progress(loaded / len(POWERTABS_SHEETS), text=f"{file_label}: {loaded}/{len(POWERTABS_SHEETS)} sheets")
+        for sheet_name, status in sheets.items():
+            st.caption(f"{SHEET_STATUS_ICONS.get(status, '❌')} {sheet_name}: {status}")
+
 # Initialize session state
 if 'uploaded_powertabs_files' not in st.session_state:
     st.session_state.uploaded_powertabs_files = []
 if 'selected_file_index' not in st.session_state:
     st.session_state.selected_file_index = 0
+if 'upload_problems' not in st.session_state:
+    st.session_state.upload_problems = []
 
 # Sidebar - Always show first
 st.sidebar.title("📊 Dashboard Controls")
@@ -168,22 +212,52 @@ with st.sidebar.expander("📁 Upload SPINS PowerTabs Files", expanded=True):
     with col1:
         if st.button("Load Files", type="primary"):
             if powertabs_files:
-                st.session_state.uploaded_powertabs_files = powertabs_files
+                # Check structure first so only valid files reach the full parse; results
+                # stay paired with their files, since uploads can share a name
+                checks = [(f, check_powertabs_workbook(f)) for f in powertabs_files]
+                st.session_state.upload_problems = [(f.name, issues) for f, issues in checks if issues]
+                st.session_state.uploaded_powertabs_files = [f for f, issues in checks if not issues]
                 st.session_state.selected_file_index = 0
-                load_powertabs_data.clear()
-                st.success(f"✓ {len(powertabs_files)} file(s) loaded")
+                # Parse in worker processes so pages render as their sheets arrive; sheets
+                # already loaded or loading, e.g. after a second click, aren't started again
+                for f in st.session_state.uploaded_powertabs_files:
+                    load_powertabs_workbook(f, get_file_hash(f)).load_in_background()
+                timer.close()
                 st.rerun()
 
     with col2:
         if st.button("Clear All"):
             st.session_state.uploaded_powertabs_files = []
             st.session_state.selected_file_index = 0
-            load_powertabs_data.clear()
+            st.session_state.file_hashes = {}
+            st.session_state.upload_problems = []
+            timer.close()
             st.rerun()
 
+    st.checkbox(
+        "Save reports to history",
+        value=SAVE_REPORT_HISTORY,
+        key='save_report_history',
+        help=(
+            f"Stores each loaded report's 52-week headline metrics in {HISTORY_DB_FILE} on this server "
+            f"for {HISTORY_RETENTION_DAYS} days, so Historical Trends can compare reports across sessions."
+        ),
+    )
+    if st.session_state.save_report_history:
+        st.caption(f"52-week metrics of reports you load are saved on this server for {HISTORY_RETENTION_DAYS} days")
+
+    # Files rejected by the structure check, with what is wrong in each
+    for file_name, problems in st.session_state.upload_problems:
+        st.error(f"✗ {file_name} was not loaded:\n" + "\n".join(f"- {problem}" for problem in problems))
+
     # Show current data source
     if st.session_state.uploaded_powertabs_files:
         st.info(f"📊 {len(st.session_state.uploaded_powertabs_files)} file(s) uploaded")
+        uploaded_files = st.session_state.uploaded_powertabs_files
+        refreshing = is_loading(upload_sheet_status(uploaded_files))
+        st.fragment(show_load_status, run_every=LOAD_STATUS_REFRESH_SECONDS if refreshing else None)(
+            uploaded_files, refreshing
+        )
     else:
         st.info("📂 Waiting for PowerTabs file(s)...")
 
@@ -214,7 +288,7 @@ if data is None or 'overview' not in data:
     st.title("📊 SPINS Marketing Intelligence Dashboard")
     st.markdown("---")
     st.info("👈 **Please upload your SPINS PowerTabs file(s) using the sidebar to get started!**")
-    st.markdown("""
+    st.markdown(f"""
     ### Required File:
     **SPINS PowerTabs - Entire Report.xlsx**
 
@@ -231,8 +305,11 @@ if data is None or 'overview' not in data:
 
     **Multiple Files:** Upload multiple monthly reports to compare trends over time in the Historical Trends tab!
 
-    Your data stays secure and is only stored temporarily for this session.
+    Parsed reports are cached on this server so they reopen quickly. Cached reports are deleted after
+    they go unused for {POWERTABS_CACHE_MAX_AGE_DAYS} days, or sooner once the cache passes {POWERTABS_CACHE_MAX_MB:,} MB.
+    A report's 52-week headline metrics are only kept longer if you turn on "Save reports to history".
     """)
+    timer.close()
     st.stop()
 
 # If data loaded successfully, continue with dashboard
@@ -270,6 +347,11 @@ if 'period_info' in data and data['period_info']:
         period = period_parts[0].replace('Period:', '').strip()
         st.sidebar.info(f"{period}")
 
+# Sheets load as pages use them, so load times are filled in after the page renders
+sheet_timings_panel = st.sidebar.empty()
+rerun_timing_panel = st.sidebar.empty()
+sheets_at_load = set(data['sheet_timings'])
+
 # Get selected period data
 selected_period_data = overview[overview.iloc[:, 0] == selected_period].iloc[0]
 selected_sales = float(selected_period_data.iloc[1])
@@ -277,6 +359,50 @@ selected_sales_growth = float(selected_period_data.iloc[2])
 selected_units = float(selected_period_data.iloc[3])
 selected_units_growth = float(selected_period_data.iloc[4])
 
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def _build_cached_figure(file_hash, period, page, chart_id, _build_figure):
+    return _build_figure()
+
+def cached_figure(chart_id, build_figure, period=None):
+    """Figure for a chart, built once per file, page and chart and reused on every rerun
+
+    Pass period for charts that change with the selected time period. Streamlit
+    serializes a Figure without re-validating it, so keeping the Figure is
+    cheaper than replaying its JSON.
+    """
+    with timer.stage(chart_id, 'figure', cache='hit') as figure_info:
+        def build():
+            figure_info['cache'] = 'miss'
+            return build_figure()
+        return _build_cached_figure(data['file_hash'], period, page, chart_id, build)
+
+def show_figure(chart_id, build_figure, period=None):
+    """Draw a chart's cached figure"""
+    figure = cached_figure(chart_id, build_figure, period)
+    with timer.stage(chart_id, 'render'):
+        st.plotly_chart(figure, use_container_width=True)
+
+def show_table(name, table, column_config):
+    """Draw a formatted table"""
+    with timer.stage(name, 'render'):
+        st.dataframe(table, column_config=column_config, use_container_width=True, hide_index=True)
+
+# Retailer scorecard priority tiers, highest first
+RETAILER_PRIORITY_TIERS = [(70, '🟢 High Priority'), (40, '🟡 Medium Priority')]
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def get_retailer_scorecard(file_hash, _retailers):
+    """Scores, percentile ranks and priority tiers for a file's retailers, computed once per file
+
+    Shared by every session, so it's read-only; derive new frames from it.
+    """
+    scorecard = score_retailers(_retailers, 'Sales', '% Chg')
+    scorecard['Priority'] = priority_tiers(scorecard['Performance Score'], RETAILER_PRIORITY_TIERS, '🔴 Low Priority')
+    return scorecard
+
+# Everything the selected page does, with figure and table stages inside it
+page_stage = timer.begin(page, 'page')
+
 # ====================================================================================
 # STRATEGIC INSIGHTS PAGE
 # ====================================================================================
@@ -535,74 +661,84 @@ elif page == "🏠 Executive Overview":
 
     if not overview.empty:
         # Create metrics display
-        fig = go.Figure()
-
-        # Add sales bars
-        fig.add_trace(go.Bar(
-            name='Sales ($)',
-            x=overview.iloc[:, 0],
-            y=overview.iloc[:, 1],
-            text=[f"${val/1e6:.2f}M" for val in overview.iloc[:, 1]],
-            textposition='auto',
-            marker_color='#1f77b4'
-        ))
-
-        fig.update_layout(
-            title="Sales by Time Period",
-            xaxis_title="Time Period",
-            yaxis_title="Sales ($)",
-            height=400,
-            showlegend=False
-        )
-
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Growth rates
-        col1, col2 = st.columns(2)
+        def build_overview_sales():
+            fig = go.Figure()
 
-        with col1:
-            fig_dollars = go.Figure()
-            fig_dollars.add_trace(go.Bar(
+            # Add sales bars
+            fig.add_trace(go.Bar(
+                name='Sales ($)',
                 x=overview.iloc[:, 0],
-                y=overview.iloc[:, 2] * 100,
-                text=[f"{val*100:+.1f}%" for val in overview.iloc[:, 2]],
+                y=overview.iloc[:, 1],
+                text=[f"${val/1e6:.2f}M" for val in overview.iloc[:, 1]],
                 textposition='auto',
-                marker_color=['#28a745' if x > 0 else '#dc3545' for x in overview.iloc[:, 2]]
+                marker_color='#1f77b4'
             ))
-            fig_dollars.update_layout(
-                title="Dollar Growth % by Period",
+
+            fig.update_layout(
+                title="Sales by Time Period",
                 xaxis_title="Time Period",
-                yaxis_title="Growth %",
-                height=350
+                yaxis_title="Sales ($)",
+                height=400,
+                showlegend=False
             )
-            st.plotly_chart(fig_dollars, use_container_width=True)
+            return fig
+
+        show_figure('overview_sales', build_overview_sales)
+
+        # Growth rates
+        col1, col2 = st.columns(2)
+
+        with col1:
+            def build_overview_dollar_growth():
+                fig_dollars = go.Figure()
+                fig_dollars.add_trace(go.Bar(
+                    x=overview.iloc[:, 0],
+                    y=overview.iloc[:, 2] * 100,
+                    text=[f"{val*100:+.1f}%" for val in overview.iloc[:, 2]],
+                    textposition='auto',
+                    marker_color=['#28a745' if x > 0 else '#dc3545' for x in overview.iloc[:, 2]]
+                ))
+                fig_dollars.update_layout(
+                    title="Dollar Growth % by Period",
+                    xaxis_title="Time Period",
+                    yaxis_title="Growth %",
+                    height=350
+                )
+                return fig_dollars
+
+            show_figure('overview_dollar_growth', build_overview_dollar_growth)
 
         with col2:
-            fig_units = go.Figure()
-            fig_units.add_trace(go.Bar(
-                x=overview.iloc[:, 0],
-                y=overview.iloc[:, 4] * 100,
-                text=[f"{val*100:+.1f}%" for val in overview.iloc[:, 4]],
-                textposition='auto',
-                marker_color=['#28a745' if x > 0 else '#dc3545' for x in overview.iloc[:, 4]]
-            ))
-            fig_units.update_layout(
-                title="Unit Growth % by Period",
-                xaxis_title="Time Period",
-                yaxis_title="Growth %",
-                height=350
-            )
-            st.plotly_chart(fig_units, use_container_width=True)
+            def build_overview_unit_growth():
+                fig_units = go.Figure()
+                fig_units.add_trace(go.Bar(
+                    x=overview.iloc[:, 0],
+                    y=overview.iloc[:, 4] * 100,
+                    text=[f"{val*100:+.1f}%" for val in overview.iloc[:, 4]],
+                    textposition='auto',
+                    marker_color=['#28a745' if x > 0 else '#dc3545' for x in overview.iloc[:, 4]]
+                ))
+                fig_units.update_layout(
+                    title="Unit Growth % by Period",
+                    xaxis_title="Time Period",
+                    yaxis_title="Growth %",
+                    height=350
+                )
+                return fig_units
+
+            show_figure('overview_unit_growth', build_overview_unit_growth)
 
         # Data table
         st.markdown("### 📋 Detailed Metrics")
-        display_df = overview.copy()
+        display_df = overview.copy(deep=False)
         display_df.columns = ['Time Period', 'Dollars', 'Dollars % Chg', 'Units', 'Units % Chg']
-        display_df['Dollars'] = display_df['Dollars'].apply(lambda x: f"${x:,.0f}")
-        display_df['Dollars % Chg'] = display_df['Dollars % Chg'].apply(lambda x: f"{x*100:+.1f}%")
-        display_df['Units'] = display_df['Units'].apply(lambda x: f"{x:,.0f}")
-        display_df['Units % Chg'] = display_df['Units % Chg'].apply(lambda x: f"{x*100:+.1f}%")
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        display_df, column_config = format_table(display_df, {
+            'Dollars': CURRENCY_FORMAT,
+            'Dollars % Chg': (PERCENT_CHANGE_FORMAT, 100),
+            'Units': NUMBER_FORMAT,
+            'Units % Chg': (PERCENT_CHANGE_FORMAT, 100),
+        })
+        show_table('Overview table', display_df, column_config)
 
 # ====================================================================================
 # RETAILER PERFORMANCE PAGE
@@ -622,69 +758,57 @@ elif page == "🏪 Retailer Performance":
 
     with col1:
         # Sales chart
-        fig_sales = px.bar(
-            retailers.head(10),
-            x='Sales',
-            y=retailers.columns[0],
-            orientation='h',
-            title="Top 10 Retailers by Sales",
-            text='Sales'
-        )
-        fig_sales.update_traces(texttemplate='$%{text:.2s}', textposition='outside')
-        fig_sales.update_layout(height=500, yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_sales, use_container_width=True)
+        def build_retailer_sales():
+            fig_sales = px.bar(
+                retailers.head(10),
+                x='Sales',
+                y=retailers.columns[0],
+                orientation='h',
+                title="Top 10 Retailers by Sales",
+                text='Sales'
+            )
+            fig_sales.update_traces(texttemplate='$%{text:.2s}', textposition='outside')
+            fig_sales.update_layout(height=500, yaxis={'categoryorder':'total ascending'})
+            return fig_sales
+
+        show_figure('retailer_sales', build_retailer_sales)
 
     with col2:
         # Growth chart
-        fig_growth = px.bar(
-            retailers.head(10),
-            x=retailers.columns[0],
-            y='% Chg',
-            title="Growth Rate by Retailer",
-            text='% Chg',
-            color='% Chg',
-            color_continuous_scale=['red', 'yellow', 'green']
-        )
-        fig_growth.update_traces(texttemplate='%{text:.1%}', textposition='outside')
-        fig_growth.update_layout(height=500, xaxis_tickangle=-45)
-        st.plotly_chart(fig_growth, use_container_width=True)
+        def build_retailer_growth():
+            fig_growth = px.bar(
+                retailers.head(10),
+                x=retailers.columns[0],
+                y='% Chg',
+                title="Growth Rate by Retailer",
+                text='% Chg',
+                color='% Chg',
+                color_continuous_scale=['red', 'yellow', 'green']
+            )
+            fig_growth.update_traces(texttemplate='%{text:.1%}', textposition='outside')
+            fig_growth.update_layout(height=500, xaxis_tickangle=-45)
+            return fig_growth
+
+        show_figure('retailer_growth', build_retailer_growth)
 
     # Performance Scorecard with weighted scoring
     st.markdown("### 📊 Retailer Performance Scorecard")
-    st.markdown("**Scoring:** 70% Sales Volume + 30% Growth Rate")
-
-    scorecard = retailers.copy()
+    st.markdown(f"**Scoring:** {weights_label()}")
 
-    # Calculate Performance Score (70% volume, 30% growth)
-    max_sales = scorecard['Sales'].max()
-    scorecard['Sales Score'] = (scorecard['Sales'] / max_sales * 100) if max_sales > 0 else 0
-
-    # Growth score: cap at +50% and -50% for scoring purposes
-    scorecard['Growth Score'] = scorecard['% Chg'].clip(-0.5, 0.5) * 100
-    scorecard['Growth Score'] = ((scorecard['Growth Score'] + 50) / 100 * 100)
-
-    # Combined Performance Score (70% sales, 30% growth)
-    scorecard['Performance Score'] = (scorecard['Sales Score'] * 0.7 + scorecard['Growth Score'] * 0.3)
-
-    # Priority tiers
-    def get_priority(score):
-        if score >= 70:
-            return '🟢 High Priority'
-        elif score >= 40:
-            return '🟡 Medium Priority'
-        else:
-            return '🔴 Low Priority'
-
-    scorecard['Priority'] = scorecard['Performance Score'].apply(get_priority)
+    with timer.stage("Retailer scorecard", 'compute'):
+        scorecard = read_only(get_retailer_scorecard(data['file_hash'], retailers))
 
     # Display scorecard
-    display_scorecard = scorecard[[scorecard.columns[0], 'Sales', '% Chg', 'Performance Score', 'Priority']].copy()
-    display_scorecard.columns = ['Retailer', 'Sales', 'Growth %', 'Performance Score', 'Priority']
-    display_scorecard['Sales'] = display_scorecard['Sales'].apply(lambda x: f"${x/1e6:.2f}M")
-    display_scorecard['Growth %'] = display_scorecard['Growth %'].apply(lambda x: f"{x*100:+.1f}%")
-    display_scorecard['Performance Score'] = display_scorecard['Performance Score'].apply(lambda x: f"{x:.1f}")
-
-    st.dataframe(display_scorecard, use_container_width=True, hide_index=True)
+    display_scorecard = scorecard[[scorecard.columns[0], 'Sales', '% Chg', 'Performance Score', 'Sales Percentile', 'Growth Percentile', 'Priority']]
+    display_scorecard.columns = ['Retailer', 'Sales', 'Growth %', 'Performance Score', 'Sales Percentile', 'Growth Percentile', 'Priority']
+    display_scorecard, column_config = format_table(display_scorecard, {
+        'Sales': (MILLIONS_CURRENCY_FORMAT, 1e-6),
+        'Growth %': (PERCENT_CHANGE_FORMAT, 100),
+        'Performance Score': ONE_DECIMAL_FORMAT,
+        'Sales Percentile': NUMBER_FORMAT,
+        'Growth Percentile': NUMBER_FORMAT,
+    })
+    show_table('Scorecard table', display_scorecard, column_config)
 
     # Detailed retailer metrics
     if not retailer_growth.empty:
@@ -733,26 +857,28 @@ elif page == "📈 Growth Drivers":
         impacts = growth_drivers.iloc[:, 4].tolist()
 
         # Create waterfall
-        fig = go.Figure(go.Waterfall(
-            name="Growth Impact",
-            orientation="v",
-            measure=["relative"] * len(drivers),
-            x=drivers,
-            textposition="outside",
-            text=[f"${val/1e3:.0f}K" for val in impacts],
-            y=impacts,
-            connector={"line": {"color": "rgb(63, 63, 63)"}},
-            increasing={"marker": {"color": "#28a745"}},
-            decreasing={"marker": {"color": "#dc3545"}},
-        ))
-
-        fig.update_layout(
-            title="Dollar Impact by Growth Driver",
-            showlegend=False,
-            height=500
-        )
+        def build_growth_waterfall():
+            fig = go.Figure(go.Waterfall(
+                name="Growth Impact",
+                orientation="v",
+                measure=["relative"] * len(drivers),
+                x=drivers,
+                textposition="outside",
+                text=[f"${val/1e3:.0f}K" for val in impacts],
+                y=impacts,
+                connector={"line": {"color": "rgb(63, 63, 63)"}},
+                increasing={"marker": {"color": "#28a745"}},
+                decreasing={"marker": {"color": "#dc3545"}},
+            ))
 
-        st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(
+                title="Dollar Impact by Growth Driver",
+                showlegend=False,
+                height=500
+            )
+            return fig
+
+        show_figure('growth_waterfall', build_growth_waterfall)
 
         # Driver details
         st.markdown("### 📊 Driver Details")
@@ -815,7 +941,9 @@ elif page == "🎯 Promotional Analysis":
 
     promo = data['promo']
 
-    if promo.empty or len(promo) == 0:
+    if promo.empty and promo.attrs.get('load_problem'):
+        st.warning(f"⚠️ {promo.attrs['load_problem']}")
+    elif promo.empty or len(promo) == 0:
         st.warning("⚠️ Promotional data not available in this PowerTabs report")
         st.info("This may indicate:\n- No promotions ran during this period\n- This sheet requires a specific retailer filter in PowerTabs\n- Promotional data is in a different report")
     else:
@@ -826,65 +954,76 @@ elif page == "🎯 Promotional Analysis":
 
         with col1:
             # Dollar lift by promo
-            fig_dollar = px.bar(
-                promo.sort_values('$ % Lift', ascending=False),
-                x='Promo ID',
-                y='$ % Lift',
-                title="Dollar Lift % by Promotion",
-                text='$ % Lift',
-                color='$ % Lift',
-                color_continuous_scale='Blues'
-            )
-            fig_dollar.update_traces(texttemplate='%{text:.1%}', textposition='outside')
-            st.plotly_chart(fig_dollar, use_container_width=True)
+            def build_promo_dollar_lift():
+                fig_dollar = px.bar(
+                    promo.sort_values('$ % Lift', ascending=False),
+                    x='Promo ID',
+                    y='$ % Lift',
+                    title="Dollar Lift % by Promotion",
+                    text='$ % Lift',
+                    color='$ % Lift',
+                    color_continuous_scale='Blues'
+                )
+                fig_dollar.update_traces(texttemplate='%{text:.1%}', textposition='outside')
+                return fig_dollar
+
+            show_figure('promo_dollar_lift', build_promo_dollar_lift)
 
         with col2:
             # Unit lift by promo
-            fig_unit = px.bar(
-                promo.sort_values('U % Lift', ascending=False),
-                x='Promo ID',
-                y='U % Lift',
-                title="Unit Lift % by Promotion",
-                text='U % Lift',
-                color='U % Lift',
-                color_continuous_scale='Greens'
-            )
-            fig_unit.update_traces(texttemplate='%{text:.1%}', textposition='outside')
-            st.plotly_chart(fig_unit, use_container_width=True)
+            def build_promo_unit_lift():
+                fig_unit = px.bar(
+                    promo.sort_values('U % Lift', ascending=False),
+                    x='Promo ID',
+                    y='U % Lift',
+                    title="Unit Lift % by Promotion",
+                    text='U % Lift',
+                    color='U % Lift',
+                    color_continuous_scale='Greens'
+                )
+                fig_unit.update_traces(texttemplate='%{text:.1%}', textposition='outside')
+                return fig_unit
+
+            show_figure('promo_unit_lift', build_promo_unit_lift)
 
         # Discount vs Lift analysis
         st.markdown("### 📉 Discount vs Lift Analysis")
 
-        fig_scatter = px.scatter(
-            promo,
-            x='% Disc',
-            y='$ % Lift',
-            size='# of Weeks',
-            color='U % Lift',
-            hover_data=['Base Price', 'Promo Price'],
-            title="Discount Depth vs Dollar Lift (Size = Duration)",
-            labels={'% Disc': 'Discount %', '$ % Lift': 'Dollar Lift %'}
-        )
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        def build_promo_discount_vs_lift():
+            fig_scatter = px.scatter(
+                promo,
+                x='% Disc',
+                y='$ % Lift',
+                size='# of Weeks',
+                color='U % Lift',
+                hover_data=['Base Price', 'Promo Price'],
+                title="Discount Depth vs Dollar Lift (Size = Duration)",
+                labels={'% Disc': 'Discount %', '$ % Lift': 'Dollar Lift %'}
+            )
+            return fig_scatter
+
+        show_figure('promo_discount_vs_lift', build_promo_discount_vs_lift)
 
         # Promo details table
         st.markdown("### 📋 Promotion Details")
 
-        display_promo = promo.copy()
-        display_promo['Base Price'] = display_promo['Base Price'].apply(lambda x: f"${x:.2f}")
-        display_promo['Promo Price'] = display_promo['Promo Price'].apply(lambda x: f"${x:.2f}")
-        display_promo['% Disc'] = display_promo['% Disc'].apply(lambda x: f"{x*100:.1f}%")
-        display_promo['$ % Lift'] = display_promo['$ % Lift'].apply(lambda x: f"{x*100:.1f}%")
-        display_promo['U % Lift'] = display_promo['U % Lift'].apply(lambda x: f"{x*100:.1f}%")
+        display_promo, column_config = format_table(promo, {
+            'Base Price': PRICE_FORMAT,
+            'Promo Price': PRICE_FORMAT,
+            '% Disc': (PERCENT_FORMAT, 100),
+            '$ % Lift': (PERCENT_FORMAT, 100),
+            'U % Lift': (PERCENT_FORMAT, 100),
+        })
 
-        st.dataframe(display_promo, use_container_width=True, hide_index=True)
+        show_table('Promo table', display_promo, column_config)
 
         # Recommendations
         st.markdown("---")
         st.markdown("### 💡 Promotional Recommendations")
 
         # Find most efficient promo (best lift per discount point)
-        promo['efficiency'] = promo['$ % Lift'] / abs(promo['% Disc'])
+        # Parsed data is shared across sessions, so work on a copy
+        promo = promo.assign(efficiency=promo['$ % Lift'] / abs(promo['% Disc']))
         best_promo = promo.nlargest(1, 'efficiency').iloc[0]
 
         col1, col2 = st.columns(2)
@@ -935,6 +1074,7 @@ elif page == "📊 Historical Trends":
         **Single File:** See trends across 52W, 24W, 12W, 4W time periods
         **Multiple Files:** Compare month-over-month performance across all uploaded files
         """)
+        timer.close()
         st.stop()
     elif num_files == 1:
         st.info("💡 **Single File Uploaded:** Showing trends across time periods (52W, 24W, 12W, 4W). Upload multiple monthly PowerTabs files to see month-over-month comparisons!")
@@ -950,52 +1090,114 @@ elif page == "📊 Historical Trends":
 
         with col1:
             st.markdown("#### 💵 Sales by Time Period")
-            fig_sales_periods = go.Figure()
-            fig_sales_periods.add_trace(go.Bar(
-                x=overview.iloc[:, 0],
-                y=overview.iloc[:, 1],
-                text=[f"${val/1e6:.2f}M" for val in overview.iloc[:, 1]],
-                textposition='outside',
-                marker_color='#1f77b4'
-            ))
-            fig_sales_periods.update_layout(
-                xaxis_title="Time Period",
-                yaxis_title="Sales ($)",
-                height=400,
-                showlegend=False
-            )
-            st.plotly_chart(fig_sales_periods, use_container_width=True)
+            def build_trend_sales_by_period():
+                fig_sales_periods = go.Figure()
+                fig_sales_periods.add_trace(go.Bar(
+                    x=overview.iloc[:, 0],
+                    y=overview.iloc[:, 1],
+                    text=[f"${val/1e6:.2f}M" for val in overview.iloc[:, 1]],
+                    textposition='outside',
+                    marker_color='#1f77b4'
+                ))
+                fig_sales_periods.update_layout(
+                    xaxis_title="Time Period",
+                    yaxis_title="Sales ($)",
+                    height=400,
+                    showlegend=False
+                )
+                return fig_sales_periods
+
+            show_figure('trend_sales_by_period', build_trend_sales_by_period)
 
         with col2:
             st.markdown("#### 📈 Growth Rate by Time Period")
-            fig_growth_periods = go.Figure()
-            fig_growth_periods.add_trace(go.Bar(
-                x=overview.iloc[:, 0],
-                y=overview.iloc[:, 2] * 100,
-                text=[f"{val*100:+.1f}%" for val in overview.iloc[:, 2]],
-                textposition='outside',
-                marker_color=['#28a745' if x > 0 else '#dc3545' for x in overview.iloc[:, 2]]
-            ))
-            fig_growth_periods.update_layout(
-                xaxis_title="Time Period",
-                yaxis_title="Growth %",
-                height=400,
-                showlegend=False
-            )
-            st.plotly_chart(fig_growth_periods, use_container_width=True)
+            def build_trend_growth_by_period():
+                fig_growth_periods = go.Figure()
+                fig_growth_periods.add_trace(go.Bar(
+                    x=overview.iloc[:, 0],
+                    y=overview.iloc[:, 2] * 100,
+                    text=[f"{val*100:+.1f}%" for val in overview.iloc[:, 2]],
+                    textposition='outside',
+                    marker_color=['#28a745' if x > 0 else '#dc3545' for x in overview.iloc[:, 2]]
+                ))
+                fig_growth_periods.update_layout(
+                    xaxis_title="Time Period",
+                    yaxis_title="Growth %",
+                    height=400,
+                    showlegend=False
+                )
+                return fig_growth_periods
+
+            show_figure('trend_growth_by_period', build_trend_growth_by_period)
 
         st.markdown("---")
         st.markdown("### 📊 Performance Metrics")
 
         # Show all time periods in a table
-        display_overview = overview.copy()
+        display_overview = overview.copy(deep=False)
         display_overview.columns = ['Time Period', 'Dollars', 'Dollars % Chg', 'Units', 'Units % Chg']
-        display_overview['Dollars'] = display_overview['Dollars'].apply(lambda x: f"${x/1e6:.2f}M")
-        display_overview['Dollars % Chg'] = display_overview['Dollars % Chg'].apply(lambda x: f"{x*100:+.1f}%")
-        display_overview['Units'] = display_overview['Units'].apply(lambda x: f"{x/1e3:.1f}K")
-        display_overview['Units % Chg'] = display_overview['Units % Chg'].apply(lambda x: f"{x*100:+.1f}%")
+        display_overview, column_config = format_table(display_overview, {
+            'Dollars': (MILLIONS_CURRENCY_FORMAT, 1e-6),
+            'Dollars % Chg': (PERCENT_CHANGE_FORMAT, 100),
+            'Units': (THOUSANDS_FORMAT, 1e-3),
+            'Units % Chg': (PERCENT_CHANGE_FORMAT, 100),
+        })
+
+        show_table('Period table', display_overview, column_config)
 
-        st.dataframe(display_overview, use_container_width=True, hide_index=True)
+    # Saved history from every report loaded so far
+    record_snapshot(data['file_hash'], data)
+    try:
+        snapshots = load_snapshots(limit=HISTORY_TREND_PERIODS)
+    except sqlite3.Error as e:
+        snapshots = pd.DataFrame()
+        st.warning(f"Could not read report history: {e}")
+
+    if not st.session_state.save_report_history:
+        st.caption("💾 This report isn't being saved to the report history; turn on \"Save reports to history\" in the sidebar to keep it.")
+
+    if len(snapshots) > 1:
+        st.markdown("---")
+        st.markdown(f"### 🗄️ Saved Report History (last {len(snapshots)} reports)")
+        st.markdown("**52-week metrics from every report previously loaded into the dashboard**")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            fig_saved_sales = go.Figure()
+            fig_saved_sales.add_trace(go.Scatter(
+                x=snapshots['data_period'],
+                y=snapshots['sales_52w'],
+                mode='lines+markers',
+                line=dict(color='#1f77b4', width=3),
+                marker=dict(size=8)
+            ))
+            fig_saved_sales.update_layout(
+                title="Sales (52W) by Report",
+                xaxis_title="Report Period",
+                yaxis_title="Sales ($)",
+                height=350,
+                showlegend=False,
+                xaxis_tickangle=-45
+            )
+            st.plotly_chart(fig_saved_sales, use_container_width=True)
+
+        with col2:
+            fig_saved_growth = go.Figure()
+            fig_saved_growth.add_trace(go.Bar(
+                x=snapshots['data_period'],
+                y=snapshots['sales_growth_52w'] * 100,
+                marker_color=['#28a745' if x > 0 else '#dc3545' for x in snapshots['sales_growth_52w']]
+            ))
+            fig_saved_growth.update_layout(
+                title="Sales Growth % (52W) by Report",
+                xaxis_title="Report Period",
+                yaxis_title="Growth %",
+                height=350,
+                showlegend=False,
+                xaxis_tickangle=-45
+            )
+            st.plotly_chart(fig_saved_growth, use_container_width=True)
 
     # Month-over-Month comparison (when multiple files uploaded)
     if num_files > 1:
@@ -1003,23 +1205,30 @@ elif page == "📊 Historical Trends":
         st.markdown("### 📅 File-by-File Comparison")
         st.success(f"✅ **You have {num_files} files uploaded!**")
 
-        # Load data from all files
+        summary_only = st.checkbox(
+            "⚡ Summary-only comparison",
+            value=True,
+            help="Read only the Overview and Brand by Retailer sheets of each file. Turn off to fully load every file so it opens instantly in the file selector."
+        )
+
+        # Load data from all files, parsing uncached files in parallel
+        uploaded_files = st.session_state.uploaded_powertabs_files
+        file_hashes = [get_file_hash(file) for file in uploaded_files]
+        with st.spinner(f"Loading {num_files} files..."), timer.stage("Load file summaries", 'load', files=num_files, summary_only=summary_only):
+            summaries = load_powertabs_summaries(uploaded_files, file_hashes, summary_only=summary_only)
+
         multi_file_data = []
-        for i, file in enumerate(st.session_state.uploaded_powertabs_files):
-            file_data = load_powertabs_data(file)
-            if file_data and 'overview' in file_data:
-                overview = file_data['overview']
-                week_52 = overview[overview.iloc[:, 0] == '52 Weeks']
-                if not week_52.empty:
-                    file_label = get_file_label(file)
-                    multi_file_data.append({
-                        'file_label': file_label,
-                        'sales_52w': float(week_52.iloc[0, 1]),
-                        'sales_growth_52w': float(week_52.iloc[0, 2]),
-                        'units_52w': float(week_52.iloc[0, 3]),
-                        'units_growth_52w': float(week_52.iloc[0, 4]),
-                        'retailer_count': len(file_data.get('retailers', []))
-                    })
+        for file, file_hash, summary in zip(uploaded_files, file_hashes, summaries):
+            record_snapshot(file_hash, summary=summary)
+            if summary is not None:
+                multi_file_data.append({
+                    'file_label': get_file_label(file),
+                    'sales_52w': summary['sales_52w'],
+                    'sales_growth_52w': summary['sales_growth_52w'],
+                    'units_52w': summary['units_52w'],
+                    'units_growth_52w': summary['units_growth_52w'],
+                    'retailer_count': summary['retailer_count']
+                })
 
         if len(multi_file_data) > 0:
             hist_df = pd.DataFrame(multi_file_data)
@@ -1094,16 +1303,16 @@ elif page == "📊 Historical Trends":
             st.markdown("---")
             st.markdown("### 📋 File Comparison Summary")
 
-            display_hist = hist_df.copy()
-            display_hist['sales_52w_fmt'] = display_hist['sales_52w'].apply(lambda x: f"${x/1e6:.2f}M")
-            display_hist['sales_growth_fmt'] = display_hist['sales_growth_52w'].apply(lambda x: f"{x*100:+.1f}%")
-            display_hist['units_52w_fmt'] = display_hist['units_52w'].apply(lambda x: f"{x/1e3:.1f}K")
-            display_hist['units_growth_fmt'] = display_hist['units_growth_52w'].apply(lambda x: f"{x*100:+.1f}%")
-
-            display_hist = display_hist[['file_label', 'sales_52w_fmt', 'sales_growth_fmt', 'units_52w_fmt', 'units_growth_fmt', 'retailer_count']]
+            display_hist = hist_df[['file_label', 'sales_52w', 'sales_growth_52w', 'units_52w', 'units_growth_52w', 'retailer_count']]
             display_hist.columns = ['File', 'Sales (52W)', 'Sales Growth %', 'Units (52W)', 'Units Growth %', 'Retailers']
+            display_hist, column_config = format_table(display_hist, {
+                'Sales (52W)': (MILLIONS_CURRENCY_FORMAT, 1e-6),
+                'Sales Growth %': (PERCENT_CHANGE_FORMAT, 100),
+                'Units (52W)': (THOUSANDS_FORMAT, 1e-3),
+                'Units Growth %': (PERCENT_CHANGE_FORMAT, 100),
+            })
 
-            st.dataframe(display_hist, use_container_width=True, hide_index=True)
+            show_table('File comparison table', display_hist, column_config)
 
             # File-to-File Comparison (latest vs previous)
             if len(hist_df) >= 2:
@@ -1149,6 +1358,31 @@ elif page == "📊 Historical Trends":
         else:
             st.warning("Could not load data from uploaded files")
 
+timer.end(page_stage)
+
 # Footer
 st.markdown("---")
 st.markdown("**SPINS Marketing Intelligence Dashboard** | Built for Humble Brands | Data powered by SPINS PowerTabs")
+
+# Show how long each sheet this session has used took to load
+if data['sheet_timings']:
+    with sheet_timings_panel.container():
+        with st.expander("⏱️ Sheet Load Times"):
+            if data['cache_source'] == 'sidecar':
+                st.caption("Loaded from columnar cache")
+            for sheet_name, seconds in data['sheet_timings'].items():
+                st.caption(f"{sheet_name}: {seconds:.2f}s")
+
+# Record this report in the historical snapshot store, after the page is on screen
+with timer.stage("Save history snapshot", 'store'):
+    record_snapshot(data['file_hash'], data)
+
+# Timings go last so they cover the whole rerun
+rerun_record = timer.finish(
+    page=page,
+    period=selected_period,
+    file_hash=data['file_hash'],
+    sheets_loaded=[sheet for sheet in data['sheet_timings'] if sheet not in sheets_at_load],
+)
+if rerun_record is not None:
+    show_timing_panel(rerun_timing_panel, rerun_record)
@@ -5,6 +5,30 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
+from pathlib import Path
+
+from brand_data import compact_brand_data, partition_by_time_frame, read_brand_data
+from brand_insights import CompetitorIndex, generate_insights
+from config import (
+    BRAND_DATA_FILE,
+    COMPACT_BRAND_DATA,
+    CURRENCY_FORMAT,
+    NATURAL_CHANNEL,
+    NUMBER_FORMAT,
+    ONE_DECIMAL_FORMAT,
+    PERCENT_FORMAT,
+    REQUIRED_BRAND_SHEETS,
+    REQUIRED_RAW_COLUMNS,
+    REQUIRED_TREND_SHEETS,
+    TOP_N_BRANDS,
+    TREND_DATA_FILE,
+)
+from display_format import format_table
+from file_hash import file_sha256
+from retailer_scorecard import priority_tiers, score_retailers, weights_label
+from shared_data import read_only
+from trend_data import TrendStore, read_trend_data
+from workbook_check import check_workbook
 
 # Page configuration
 st.set_page_config(
@@ -41,50 +65,75 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Data loading functions
-@st.cache_data
-def load_brand_data(file_source=None):
-    """Load the brand and retailers data"""
-    if file_source is not None:
-        df = pd.read_excel(file_source, sheet_name='Raw')
-    else:
-        df = pd.read_excel('SPINs Brand and Retailers_110225.xlsx', sheet_name='Raw')
-
-    # Clean percentage columns - convert to numeric
-    pct_cols = [col for col in df.columns if '% Chg' in col or '% ACV' in col]
-    for col in pct_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Clean ARP columns
-    arp_cols = [col for col in df.columns if 'ARP' in col]
-    for col in arp_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    return df
-
-@st.cache_data
-def load_trend_data(file_source=None):
-    """Load the Humble trend data"""
-    if file_source is not None:
-        df = pd.read_excel(file_source, sheet_name='Raw')
-    else:
-        df = pd.read_excel('SPINs Humble_Trended Sale_100525.xlsx', sheet_name='Raw')
-
-    # Clean percentage columns
-    pct_cols = [col for col in df.columns if '% Chg' in col or '% ACV' in col]
-    for col in pct_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Convert TIME FRAME to datetime for sorting
-    df['Date'] = pd.to_datetime(df['TIME FRAME'].str.extract(r'(\d{2}/\d{2}/\d{4})')[0], format='%m/%d/%Y')
-    df = df.sort_values('Date')
-
-    return df
+def get_file_hash(file_source, default_file):
+    """Content hash of an uploaded file, computed once per upload in this session
+
+    Without an upload, the default file is keyed by its path and modification time.
+    """
+    if file_source is None:
+        return f"{default_file}@{Path(default_file).stat().st_mtime_ns}"
+
+    if 'file_hashes' not in st.session_state:
+        st.session_state.file_hashes = {}
+    if file_source.file_id not in st.session_state.file_hashes:
+        st.session_state.file_hashes[file_source.file_id] = file_sha256(file_source)
+    return st.session_state.file_hashes[file_source.file_id]
+
+@st.cache_resource(max_entries=4)
+def load_brand_data(file_key, _file_source=None):
+    """Load the brand and retailers data, partitioned by TIME FRAME
+
+    The Raw sheet is streamed with openpyxl in read-only mode and numeric
+    columns are coerced as rows are read. Returns (brand_df, {time frame: rows}),
+    shared by every rerun and session that loads the same file content; pages
+    use read_only views of them.
+    """
+    df = read_brand_data(_file_source)
+
+    # Categorical dimensions and narrower measures cut per-session memory
+    if COMPACT_BRAND_DATA:
+        df = compact_brand_data(df)
+
+    return partition_by_time_frame(df)
+
+@st.cache_resource(max_entries=4)
+def load_trend_data(file_key, _file_source=None):
+    """Load the Humble trend data, indexed by channel and date
+
+    Cached as a resource by content hash so reruns share one store instead of
+    unpickling a copy of every row; channel slices are new frames, safe to change.
+    """
+    return TrendStore(read_trend_data(_file_source))
+
+@st.cache_resource(max_entries=32)
+def get_competitor_index(file_key, selected_period, _period_df):
+    """Per-geography brand rankings, built once per loaded file and time frame"""
+    return CompetitorIndex(_period_df)
+
+# Retailer Performance priority tiers, highest first
+RETAILER_PRIORITY_TIERS = [(70, '🟢 High'), (50, '🟡 Medium')]
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def get_retailer_scorecard(file_key, selected_period, _humble_data):
+    """HUMBLE's retailer scorecard for one loaded file and time frame, shared read-only"""
+    scorecard = score_retailers(_humble_data[[
+        'GEOGRAPHY', 'Dollars', 'Units', 'Dollars, % Chg, Yago',
+        'Max % ACV', 'TDP', 'Dollars, Promo', '# of Stores Selling'
+    ]], 'Dollars', 'Dollars, % Chg, Yago')
+    scorecard['Priority'] = priority_tiers(scorecard['Performance Score'], RETAILER_PRIORITY_TIERS, '🔴 Low')
+
+    scorecard['Promo %'] = (scorecard['Dollars, Promo'] / scorecard['Dollars'] * 100)
+    scorecard['Dollars, % Chg, Yago'] = scorecard['Dollars, % Chg, Yago'] * 100
+    scorecard['Max % ACV'] = pd.to_numeric(scorecard['Max % ACV'], errors='coerce')
+    return scorecard
 
 # Initialize session state for uploaded files
 if 'uploaded_brand_file' not in st.session_state:
     st.session_state.uploaded_brand_file = None
 if 'uploaded_trend_file' not in st.session_state:
     st.session_state.uploaded_trend_file = None
+if 'upload_problems' not in st.session_state:
+    st.session_state.upload_problems = {}
 
 # Sidebar - Always show this first
 st.sidebar.title("📊 Dashboard Controls")
@@ -112,14 +161,20 @@ with st.sidebar.expander("📁 Upload Data Files", expanded=True):
 
         with col1:
             if st.button("Load Files", type="primary"):
+                # Check structure first so only valid files reach the full parse
+                st.session_state.upload_problems = {}
                 if brand_file:
-                    st.session_state.uploaded_brand_file = brand_file
-                    load_brand_data.clear()
-                    st.success("✓ Brand data loaded")
+                    problems = check_workbook(brand_file, REQUIRED_BRAND_SHEETS, {'Raw': REQUIRED_RAW_COLUMNS})
+                    if problems:
+                        st.session_state.upload_problems[brand_file.name] = problems
+                    else:
+                        st.session_state.uploaded_brand_file = brand_file
                 if trend_file:
-                    st.session_state.uploaded_trend_file = trend_file
-                    load_trend_data.clear()
-                    st.success("✓ Trend data loaded")
+                    problems = check_workbook(trend_file, REQUIRED_TREND_SHEETS, {'Raw': REQUIRED_RAW_COLUMNS})
+                    if problems:
+                        st.session_state.upload_problems[trend_file.name] = problems
+                    else:
+                        st.session_state.uploaded_trend_file = trend_file
                 if brand_file or trend_file:
                     st.rerun()
 
@@ -127,10 +182,13 @@ with st.sidebar.expander("📁 Upload Data Files", expanded=True):
             if st.button("Reset to Default"):
                 st.session_state.uploaded_brand_file = None
                 st.session_state.uploaded_trend_file = None
-                load_brand_data.clear()
-                load_trend_data.clear()
+                st.session_state.upload_problems = {}
                 st.rerun()
 
+        # Files rejected by the structure check, with what is wrong in each
+        for file_name, problems in st.session_state.upload_problems.items():
+            st.error(f"✗ {file_name} was not loaded:\n" + "\n".join(f"- {problem}" for problem in problems))
+
         # Show current data source
         if st.session_state.uploaded_brand_file or st.session_state.uploaded_trend_file:
             st.info("📊 Using uploaded data")
@@ -141,8 +199,12 @@ st.sidebar.markdown("---")
 
 # Load data
 try:
-    brand_df = load_brand_data(st.session_state.uploaded_brand_file)
-    trend_df = load_trend_data(st.session_state.uploaded_trend_file)
+    brand_file_key = get_file_hash(st.session_state.uploaded_brand_file, BRAND_DATA_FILE)
+    brand_df, brand_periods = load_brand_data(brand_file_key, st.session_state.uploaded_brand_file)
+    brand_df = read_only(brand_df)
+    trend_file_key = get_file_hash(st.session_state.uploaded_trend_file, TREND_DATA_FILE)
+    trend_store = load_trend_data(trend_file_key, st.session_state.uploaded_trend_file)
+    trend_df = read_only(trend_store.frame)
     data_loaded = True
 except Exception as e:
     data_loaded = False
@@ -177,204 +239,13 @@ if data_loaded:
     st.sidebar.markdown("### Filters")
 
     # Common filters
-    time_periods = sorted(brand_df['TIME FRAME'].dropna().unique())
+    time_periods = sorted(brand_periods)
     selected_period = st.sidebar.selectbox("Time Period", time_periods, index=len(time_periods)-1)
 
-    # Filter data based on selection
-    filtered_df = brand_df[brand_df['TIME FRAME'] == selected_period].copy()
-
-    # Strategic analysis functions
-    def generate_insights(filtered_df, brand_df, trend_df, selected_period):
-        """Generate strategic insights and recommendations"""
-        insights = {
-            'alerts': [],
-            'opportunities': [],
-            'threats': [],
-            'recommendations': [],
-            'key_metrics': {}
-        }
-
-        # Get HUMBLE data
-        humble_data = filtered_df[filtered_df['DESCRIPTION'] == 'HUMBLE']
-
-        if humble_data.empty:
-            return insights
-
-        # Calculate key metrics
-        total_sales = humble_data['Dollars'].sum()
-        total_units = humble_data['Units'].sum()
-        avg_growth = humble_data['Dollars, % Chg, Yago'].mean()
-        avg_acv = humble_data['Max % ACV'].astype(float).mean()
-        promo_sales = humble_data['Dollars, Promo'].sum()
-        promo_pct = (promo_sales / total_sales * 100) if total_sales > 0 else 0
-
-        insights['key_metrics'] = {
-            'total_sales': total_sales,
-            'avg_growth': avg_growth * 100,
-            'avg_acv': avg_acv,
-            'promo_pct': promo_pct
-        }
-
-        # ALERTS - Identify concerning trends
-        if avg_growth < -0.05:
-            insights['alerts'].append({
-                'severity': 'high',
-                'title': 'Declining Sales Trend',
-                'description': f'Sales are down {abs(avg_growth)*100:.1f}% YoY. Immediate action required.',
-                'metric': avg_growth * 100
-            })
-
-        if promo_pct > 50:
-            insights['alerts'].append({
-                'severity': 'medium',
-                'title': 'High Promotional Dependency',
-                'description': f'{promo_pct:.1f}% of sales come from promotions. Risk of margin erosion.',
-                'metric': promo_pct
-            })
-
-        # Check for distribution losses
-        declining_acv = humble_data[humble_data['Max % ACV, +/- Chg, Yago'] < -5]
-        if not declining_acv.empty:
-            for _, row in declining_acv.iterrows():
-                insights['alerts'].append({
-                    'severity': 'high',
-                    'title': f'Distribution Loss at {row["GEOGRAPHY"]}',
-                    'description': f'ACV dropped by {abs(row["Max % ACV, +/- Chg, Yago"]):.1f} points.',
-                    'metric': row['Max % ACV, +/- Chg, Yago']
-                })
-
-        # OPPORTUNITIES - Identify growth opportunities
-        high_growth_retailers = humble_data[humble_data['Dollars, % Chg, Yago'] > 0.15].sort_values('Dollars, % Chg, Yago', ascending=False)
-        for _, row in high_growth_retailers.head(3).iterrows():
-            insights['opportunities'].append({
-                'title': f'Strong Growth at {row["GEOGRAPHY"]}',
-                'description': f'Sales up {row["Dollars, % Chg, Yago"]*100:.1f}% YoY. Consider increasing investment.',
-                'metric': row['Dollars, % Chg, Yago'] * 100,
-                'action': f'Expand distribution or promotional support at {row["GEOGRAPHY"]}'
-            })
+    # Rows for the selected period, split out once when the file loaded
+    filtered_df = read_only(brand_periods[selected_period])
 
-        # Low ACV but high sales velocity = opportunity
-        for _, row in humble_data.iterrows():
-            acv = pd.to_numeric(row['Max % ACV'], errors='coerce')
-            if pd.notna(acv) and acv < 50 and row['Dollars'] > humble_data['Dollars'].median():
-                velocity = row['Units'] / row['# of Stores Selling'] if row['# of Stores Selling'] > 0 else 0
-                if velocity > humble_data['Units'].sum() / humble_data['# of Stores Selling'].sum():
-                    insights['opportunities'].append({
-                        'title': f'Distribution Gap at {row["GEOGRAPHY"]}',
-                        'description': f'Strong velocity ({velocity:.1f} units/store) but only {acv:.1f}% ACV.',
-                        'metric': acv,
-                        'action': f'Negotiate expanded distribution at {row["GEOGRAPHY"]}'
-                    })
-
-        # THREATS - Competitive analysis
-        for geo in humble_data['GEOGRAPHY'].unique():
-            geo_data = filtered_df[filtered_df['GEOGRAPHY'] == geo]
-            humble_sales = geo_data[geo_data['DESCRIPTION'] == 'HUMBLE']['Dollars'].sum()
-
-            # Find competitors with higher growth
-            competitors = geo_data[geo_data['DESCRIPTION'] != 'HUMBLE'].copy()
-            if not competitors.empty:
-                top_competitors = competitors.nlargest(5, 'Dollars')
-                growing_competitors = top_competitors[top_competitors['Dollars, % Chg, Yago'] > avg_growth + 0.10]
-
-                for _, comp in growing_competitors.iterrows():
-                    if comp['Dollars'] > humble_sales * 0.5:  # Significant competitor
-                        insights['threats'].append({
-                            'title': f'{comp["DESCRIPTION"]} Gaining Share',
-                            'description': f'Growing {comp["Dollars, % Chg, Yago"]*100:.1f}% YoY at {geo}, faster than HUMBLE.',
-                            'metric': comp['Dollars, % Chg, Yago'] * 100,
-                            'competitor': comp['DESCRIPTION']
-                        })
-
-        # RECOMMENDATIONS
-        # 1. Retailer prioritization
-        retailer_scores = []
-        for _, row in humble_data.iterrows():
-            score = 0
-            growth = row['Dollars, % Chg, Yago'] if pd.notna(row['Dollars, % Chg, Yago']) else 0
-            sales = row['Dollars']
-
-            # Score based on sales and growth
-            if growth > 0.10:
-                score += 3
-            elif growth > 0:
-                score += 1
-            elif growth < -0.10:
-                score -= 2
-
-            if sales > humble_data['Dollars'].quantile(0.75):
-                score += 2
-
-            retailer_scores.append({
-                'retailer': row['GEOGRAPHY'],
-                'score': score,
-                'sales': sales,
-                'growth': growth * 100
-            })
-
-        retailer_scores = sorted(retailer_scores, key=lambda x: x['score'], reverse=True)
-
-        # Top priority retailers
-        if retailer_scores:
-            top_3 = retailer_scores[:3]
-            insights['recommendations'].append({
-                'category': 'Retailer Focus',
-                'priority': 'high',
-                'title': 'Prioritize High-Performance Retailers',
-                'actions': [f"{r['retailer']}: ${r['sales']:,.0f} sales, {r['growth']:.1f}% growth" for r in top_3],
-                'rationale': 'These retailers show strong performance and growth momentum.'
-            })
-
-        # Declining retailers need attention
-        declining = [r for r in retailer_scores if r['growth'] < -5]
-        if declining:
-            insights['recommendations'].append({
-                'category': 'Retailer Risk',
-                'priority': 'high',
-                'title': 'Address Declining Retailers',
-                'actions': [f"{r['retailer']}: {r['growth']:.1f}% decline" for r in declining[:3]],
-                'rationale': 'Immediate intervention needed to reverse negative trends.'
-            })
-
-        # 2. Promotional strategy
-        if promo_pct > 40:
-            insights['recommendations'].append({
-                'category': 'Promotional Strategy',
-                'priority': 'medium',
-                'title': 'Reduce Promotional Dependency',
-                'actions': [
-                    f'Current promo mix: {promo_pct:.1f}% (Target: 25-35%)',
-                    'Improve everyday shelf presence and visibility',
-                    'Test premium positioning at select retailers'
-                ],
-                'rationale': 'High promotional dependency erodes margins and brand equity.'
-            })
-        elif promo_pct < 20:
-            insights['recommendations'].append({
-                'category': 'Promotional Strategy',
-                'priority': 'low',
-                'title': 'Consider Increased Promotional Activity',
-                'actions': [
-                    f'Current promo mix: {promo_pct:.1f}%',
-                    'Test targeted promotions at underperforming retailers',
-                    'Trial sampling programs to drive awareness'
-                ],
-                'rationale': 'Limited promotional activity may be leaving sales on the table.'
-            })
-
-        # 3. Distribution expansion
-        low_acv_retailers = humble_data[humble_data['Max % ACV'].astype(float) < 50]
-        if not low_acv_retailers.empty:
-            insights['recommendations'].append({
-                'category': 'Distribution',
-                'priority': 'medium',
-                'title': 'Expand Distribution Coverage',
-                'actions': [f"{row['GEOGRAPHY']}: {pd.to_numeric(row['Max % ACV'], errors='coerce'):.1f}% ACV"
-                           for _, row in low_acv_retailers.head(3).iterrows()],
-                'rationale': 'Low ACV indicates significant white space opportunity.'
-            })
-
-        return insights
+    competitor_index = get_competitor_index(brand_file_key, selected_period, filtered_df)
 
     # Main content
     if page == "💡 Strategic Insights":
@@ -384,7 +255,7 @@ if data_loaded:
         st.markdown("---")
 
         # Generate insights
-        insights = generate_insights(filtered_df, brand_df, trend_df, selected_period)
+        insights = generate_insights(filtered_df, brand_df, trend_df, selected_period, competitor_index)
 
         # Executive Summary
         st.subheader("📊 Executive Summary")
@@ -532,7 +403,7 @@ if data_loaded:
         st.subheader("📉 Performance Trends")
 
         # Get trend data for HUMBLE
-        natural_trend = trend_df[trend_df['GEOGRAPHY'] == 'TOTAL US - NATURAL EXPANDED CHANNEL'].copy()
+        natural_trend = trend_store.channel(NATURAL_CHANNEL)
 
         if not natural_trend.empty and len(natural_trend) >= 12:
             # Calculate trend indicators
@@ -641,7 +512,7 @@ if data_loaded:
 
             with col1:
                 st.subheader("Sales by Retailer")
-                retailer_sales = humble_data.groupby('GEOGRAPHY')['Dollars'].sum().sort_values(ascending=False).head(10)
+                retailer_sales = humble_data.groupby('GEOGRAPHY', observed=True)['Dollars'].sum().sort_values(ascending=False).head(10)
                 fig = px.bar(
                     x=retailer_sales.values,
                     y=retailer_sales.index,
@@ -672,7 +543,7 @@ if data_loaded:
             st.markdown("---")
             st.subheader("Sales Trend - Last 2 Years")
 
-            trend_natural = trend_df[trend_df['GEOGRAPHY'] == 'TOTAL US - NATURAL EXPANDED CHANNEL'].copy()
+            trend_natural = trend_store.channel(NATURAL_CHANNEL)
 
             if not trend_natural.empty:
                 fig = go.Figure()
@@ -733,24 +604,26 @@ if data_loaded:
 
             with col1:
                 st.subheader("Sales by Retailer")
-                sales_table = brand_data[['GEOGRAPHY', 'Dollars', 'Units', 'Dollars, % Chg, Yago']].copy()
+                sales_table = brand_data[['GEOGRAPHY', 'Dollars', 'Units', 'Dollars, % Chg, Yago']]
                 sales_table['Dollars, % Chg, Yago'] = sales_table['Dollars, % Chg, Yago'] * 100
                 sales_table = sales_table.sort_values('Dollars', ascending=False)
                 sales_table.columns = ['Retailer', 'Sales ($)', 'Units', 'YoY Growth (%)']
+                sales_table, column_config = format_table(sales_table, {
+                    'Sales ($)': CURRENCY_FORMAT,
+                    'Units': NUMBER_FORMAT,
+                    'YoY Growth (%)': PERCENT_FORMAT
+                })
                 st.dataframe(
-                    sales_table.style.format({
-                        'Sales ($)': '${:,.0f}',
-                        'Units': '{:,.0f}',
-                        'YoY Growth (%)': '{:.1f}%'
-                    }),
+                    sales_table,
+                    column_config=column_config,
                     height=400,
                     width='stretch'
                 )
 
             with col2:
                 st.subheader("Promotional Mix")
-                promo_data = brand_data[['GEOGRAPHY', 'Dollars, Promo', 'Dollars, Non-Promo']].copy()
-                promo_data = promo_data.groupby('GEOGRAPHY').sum().reset_index()
+                promo_data = brand_data[['GEOGRAPHY', 'Dollars, Promo', 'Dollars, Non-Promo']]
+                promo_data = promo_data.groupby('GEOGRAPHY', observed=True).sum().reset_index()
                 promo_data['Total'] = promo_data['Dollars, Promo'] + promo_data['Dollars, Non-Promo']
                 promo_data = promo_data.sort_values('Total', ascending=False).head(10)
 
@@ -784,7 +657,7 @@ if data_loaded:
             col1, col2 = st.columns(2)
 
             with col1:
-                dist_data = brand_data[['GEOGRAPHY', 'Max % ACV', 'TDP']].copy()
+                dist_data = brand_data[['GEOGRAPHY', 'Max % ACV', 'TDP']]
                 dist_data['Max % ACV'] = pd.to_numeric(dist_data['Max % ACV'], errors='coerce')
                 dist_data = dist_data.dropna().sort_values('Max % ACV', ascending=False).head(10)
 
@@ -799,7 +672,7 @@ if data_loaded:
                 st.plotly_chart(fig, width='stretch')
 
             with col2:
-                velocity = brand_data[['GEOGRAPHY', '# of Stores Selling', 'Units']].copy()
+                velocity = brand_data[['GEOGRAPHY', '# of Stores Selling', 'Units']]
                 velocity['Units per Store'] = velocity['Units'] / velocity['# of Stores Selling']
                 velocity = velocity.dropna().sort_values('Units per Store', ascending=False).head(10)
 
@@ -819,16 +692,16 @@ if data_loaded:
         st.markdown("---")
 
         # Geography selector
-        geographies = sorted(filtered_df['GEOGRAPHY'].dropna().unique())
+        geographies = competitor_index.geographies
         selected_geo = st.selectbox("Select Market/Retailer", geographies)
 
-        geo_data = filtered_df[filtered_df['GEOGRAPHY'] == selected_geo].copy()
+        geo_data = competitor_index.geo_rows(selected_geo)
 
         if not geo_data.empty:
-            # Top brands
-            top_brands = geo_data.nlargest(20, 'Dollars')
+            # Top brands, with market share of the top group precomputed
+            top_brands = competitor_index.top_brands(selected_geo)
 
-            st.subheader(f"Top 20 Brands - {selected_geo}")
+            st.subheader(f"Top {TOP_N_BRANDS} Brands - {selected_geo}")
 
             col1, col2 = st.columns([2, 1])
 
@@ -846,18 +719,16 @@ if data_loaded:
 
             with col2:
                 # Market share
-                top_brands_copy = top_brands.copy()
-                total_top20 = top_brands_copy['Dollars'].sum()
-                top_brands_copy['Share'] = (top_brands_copy['Dollars'] / total_top20 * 100)
-
                 st.markdown("### Market Share %")
-                share_table = top_brands_copy[['DESCRIPTION', 'Share', 'Dollars']].sort_values('Share', ascending=False)
+                share_table = top_brands[['DESCRIPTION', 'Share', 'Dollars']].sort_values('Share', ascending=False)
                 share_table.columns = ['Brand', 'Share %', 'Sales ($)']
+                share_table, column_config = format_table(share_table, {
+                    'Share %': PERCENT_FORMAT,
+                    'Sales ($)': CURRENCY_FORMAT
+                })
                 st.dataframe(
-                    share_table.style.format({
-                        'Share %': '{:.1f}%',
-                        'Sales ($)': '${:,.0f}'
-                    }),
+                    share_table,
+                    column_config=column_config,
                     height=600,
                     width='stretch'
                 )
@@ -869,7 +740,7 @@ if data_loaded:
 
             with col1:
                 st.subheader("Growth Leaders")
-                growth_leaders = geo_data.nlargest(10, 'Dollars, % Chg, Yago')[['DESCRIPTION', 'Dollars', 'Dollars, % Chg, Yago']].copy()
+                growth_leaders = geo_data.nlargest(10, 'Dollars, % Chg, Yago')[['DESCRIPTION', 'Dollars', 'Dollars, % Chg, Yago']]
                 growth_leaders['Dollars, % Chg, Yago'] = growth_leaders['Dollars, % Chg, Yago'] * 100
                 growth_leaders = growth_leaders[growth_leaders['Dollars, % Chg, Yago'] > 0]
 
@@ -887,7 +758,7 @@ if data_loaded:
 
             with col2:
                 st.subheader("Declining Brands")
-                decliners = geo_data.nsmallest(10, 'Dollars, % Chg, Yago')[['DESCRIPTION', 'Dollars', 'Dollars, % Chg, Yago']].copy()
+                decliners = geo_data.nsmallest(10, 'Dollars, % Chg, Yago')[['DESCRIPTION', 'Dollars', 'Dollars, % Chg, Yago']]
                 decliners['Dollars, % Chg, Yago'] = decliners['Dollars, % Chg, Yago'] * 100
                 decliners = decliners[decliners['Dollars, % Chg, Yago'] < 0]
 
@@ -910,76 +781,48 @@ if data_loaded:
         st.markdown("---")
 
         # Focus on Humble
-        humble_data = filtered_df[filtered_df['DESCRIPTION'] == 'HUMBLE'].copy()
+        humble_data = filtered_df[filtered_df['DESCRIPTION'] == 'HUMBLE']
 
         if not humble_data.empty:
             st.subheader("HUMBLE Performance by Retailer")
             st.markdown("*Retailers ranked by Performance Score (weighted combination of sales volume + growth)*")
 
-            # Create comprehensive retailer scorecard
-            scorecard = humble_data[[
-                'GEOGRAPHY', 'Dollars', 'Units', 'Dollars, % Chg, Yago',
-                'Max % ACV', 'TDP', 'Dollars, Promo', '# of Stores Selling'
-            ]].copy()
-
-            scorecard['Promo %'] = (scorecard['Dollars, Promo'] / scorecard['Dollars'] * 100)
-            scorecard['Dollars, % Chg, Yago'] = scorecard['Dollars, % Chg, Yago'] * 100
-            scorecard['Max % ACV'] = pd.to_numeric(scorecard['Max % ACV'], errors='coerce')
-
-            # Calculate Performance Score (weighted: 70% volume, 30% growth)
-            # Normalize sales to 0-100 scale
-            max_sales = scorecard['Dollars'].max()
-            scorecard['Sales Score'] = (scorecard['Dollars'] / max_sales * 100) if max_sales > 0 else 0
-
-            # Growth score: cap at +50% and -50% for scoring purposes
-            scorecard['Growth Score'] = scorecard['Dollars, % Chg, Yago'].clip(-50, 50)
-            # Normalize to 0-100 scale (0% growth = 50 points, +50% = 100 points, -50% = 0 points)
-            scorecard['Growth Score'] = ((scorecard['Growth Score'] + 50) / 100 * 100)
-
-            # Combined Performance Score (70% sales, 30% growth)
-            scorecard['Performance Score'] = (scorecard['Sales Score'] * 0.7 + scorecard['Growth Score'] * 0.3)
-
-            # Add priority tier
-            def get_priority(row):
-                score = row['Performance Score']
-                if score >= 70:
-                    return '🟢 High'
-                elif score >= 50:
-                    return '🟡 Medium'
-                else:
-                    return '🔴 Low'
-
-            scorecard['Priority'] = scorecard.apply(get_priority, axis=1)
+            # Scores, percentile ranks and tiers, computed once per file and period
+            scorecard = read_only(get_retailer_scorecard(brand_file_key, selected_period, humble_data))
 
             # Sort by performance score
             scorecard = scorecard.sort_values('Performance Score', ascending=False)
 
             # Display table
-            display_cols = ['GEOGRAPHY', 'Performance Score', 'Priority', 'Dollars', 'Dollars, % Chg, Yago', 'Units', 'Max % ACV', 'TDP', 'Promo %', '# of Stores Selling']
-            scorecard_display = scorecard[display_cols].copy()
-            scorecard_display.columns = ['Retailer', 'Performance Score', 'Priority', 'Sales ($)', 'YoY Growth %', 'Units', 'ACV %', 'TDP', 'Promo %', 'Stores']
-
+            display_cols = ['GEOGRAPHY', 'Performance Score', 'Priority', 'Dollars', 'Dollars, % Chg, Yago', 'Units', 'Max % ACV', 'TDP', 'Promo %', '# of Stores Selling', 'Sales Percentile', 'Growth Percentile']
+            scorecard_display = scorecard[display_cols]
+            scorecard_display.columns = ['Retailer', 'Performance Score', 'Priority', 'Sales ($)', 'YoY Growth %', 'Units', 'ACV %', 'TDP', 'Promo %', 'Stores', 'Sales Percentile', 'Growth Percentile']
+
+            scorecard_display, column_config = format_table(scorecard_display, {
+                'Performance Score': NUMBER_FORMAT,
+                'Sales ($)': CURRENCY_FORMAT,
+                'Units': NUMBER_FORMAT,
+                'YoY Growth %': PERCENT_FORMAT,
+                'ACV %': ONE_DECIMAL_FORMAT,
+                'TDP': ONE_DECIMAL_FORMAT,
+                'Promo %': PERCENT_FORMAT,
+                'Stores': NUMBER_FORMAT,
+                'Sales Percentile': NUMBER_FORMAT,
+                'Growth Percentile': NUMBER_FORMAT
+            })
             st.dataframe(
-                scorecard_display.style.format({
-                    'Performance Score': '{:.0f}',
-                    'Sales ($)': '${:,.0f}',
-                    'Units': '{:,.0f}',
-                    'YoY Growth %': '{:.1f}%',
-                    'ACV %': '{:.1f}',
-                    'TDP': '{:.1f}',
-                    'Promo %': '{:.1f}%',
-                    'Stores': '{:.0f}'
-                }).background_gradient(subset=['Performance Score'], cmap='RdYlGn', vmin=0, vmax=100),
+                scorecard_display.style.background_gradient(subset=['Performance Score'], cmap='RdYlGn', vmin=0, vmax=100),
+                column_config=column_config,
                 width='stretch',
                 height=400
             )
 
             # Add explanation
             with st.expander("ℹ️ How Performance Score Works"):
-                st.markdown("""
-                **Performance Score Formula:**
-                - 70% weighted on Sales Volume (bigger accounts = higher score)
-                - 30% weighted on YoY Growth Rate (faster growth = higher score)
+                st.markdown(f"""
+                **Performance Score Formula:** {weights_label()}
+                - Sales Volume: bigger accounts = higher score
+                - YoY Growth Rate: faster growth = higher score
 
                 **Why This Matters:**
                 - A retailer with $2M+ sales and 20% growth scores higher than one with $90K and 800% growth
@@ -1081,7 +924,7 @@ if data_loaded:
 
             with col1:
                 st.subheader("Top 10 by Performance Score")
-                top_performers = scorecard.head(10)[['GEOGRAPHY', 'Performance Score', 'Dollars', 'Dollars, % Chg, Yago']].copy()
+                top_performers = scorecard.head(10)[['GEOGRAPHY', 'Performance Score', 'Dollars', 'Dollars, % Chg, Yago']]
 
                 fig = px.bar(
                     top_performers,
@@ -1118,15 +961,14 @@ if data_loaded:
         st.markdown("---")
 
         # Geography selector for trends
-        geographies = sorted(trend_df['GEOGRAPHY'].dropna().unique())
         selected_geos = st.multiselect(
             "Select Channels to Compare",
-            geographies,
-            default=['TOTAL US - NATURAL EXPANDED CHANNEL']
+            trend_store.geographies,
+            default=[NATURAL_CHANNEL]
         )
 
         if selected_geos:
-            trend_subset = trend_df[trend_df['GEOGRAPHY'].isin(selected_geos)].copy()
+            trend_subset = trend_store.channels(selected_geos)
 
             # Sales trend
             st.subheader("Sales Trend (12-Week Rolling)")
@@ -1146,7 +988,7 @@ if data_loaded:
             # Growth rate trend
             st.subheader("YoY Growth Rate Trend")
 
-            trend_subset_growth = trend_subset.copy()
+            trend_subset_growth = trend_subset.copy(deep=False)
             trend_subset_growth['Dollars, % Chg, Yago'] = pd.to_numeric(trend_subset_growth['Dollars, % Chg, Yago'], errors='coerce') * 100
 
             fig = px.line(
@@ -1197,7 +1039,7 @@ if data_loaded:
             col1, col2 = st.columns(2)
 
             with col1:
-                trend_subset_promo = trend_subset.copy()
+                trend_subset_promo = trend_subset.copy(deep=False)
                 trend_subset_promo['Promo %'] = (trend_subset_promo['Dollars, Promo'] / trend_subset_promo['Dollars'] * 100)
 
                 fig = px.line(
@@ -1231,7 +1073,7 @@ if data_loaded:
         st.markdown("---")
 
         # Focus on Humble
-        humble_data = filtered_df[filtered_df['DESCRIPTION'] == 'HUMBLE'].copy()
+        humble_data = filtered_df[filtered_df['DESCRIPTION'] == 'HUMBLE']
 
         if not humble_data.empty:
             # Calculate promotional metrics
@@ -1263,7 +1105,7 @@ if data_loaded:
             promo_analysis = humble_data[[
                 'GEOGRAPHY', 'Dollars', 'Dollars, Promo', 'Dollars, Non-Promo',
                 'Units, Promo', 'Units, Non-Promo', 'Promo %'
-            ]].copy()
+            ]]
             promo_analysis = promo_analysis.sort_values('Dollars', ascending=False)
 
             col1, col2 = st.columns([2, 1])
@@ -1297,8 +1139,10 @@ if data_loaded:
                 st.markdown("### Promo % by Retailer")
                 promo_pct_data = promo_analysis[['GEOGRAPHY', 'Promo %']].sort_values('Promo %', ascending=False)
                 promo_pct_data.columns = ['Retailer', 'Promo %']
+                promo_pct_data, column_config = format_table(promo_pct_data, {'Promo %': PERCENT_FORMAT})
                 st.dataframe(
-                    promo_pct_data.style.format({'Promo %': '{:.1f}%'}).background_gradient(subset=['Promo %'], cmap='Oranges'),
+                    promo_pct_data.style.background_gradient(subset=['Promo %'], cmap='Oranges'),
+                    column_config=column_config,
                     height=400,
                     width='stretch'
                 )
@@ -1309,7 +1153,7 @@ if data_loaded:
             st.subheader("Promotional Trends Over Time")
 
             # Use trend data for time series
-            trend_natural = trend_df[trend_df['GEOGRAPHY'] == 'TOTAL US - NATURAL EXPANDED CHANNEL'].copy()
+            trend_natural = trend_store.channel(NATURAL_CHANNEL)
 
             if not trend_natural.empty:
                 trend_natural['Promo %'] = (trend_natural['Dollars, Promo'] / trend_natural['Dollars'] * 100)
@@ -1359,6 +1203,12 @@ if data_loaded:
     st.sidebar.markdown("---")
     st.sidebar.markdown("### Data Refresh")
     st.sidebar.info(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    memory_report = brand_df.attrs.get('memory_report')
+    if memory_report:
+        st.sidebar.caption(
+            f"Brand data memory: {memory_report['before_bytes']/1e6:.1f} MB → "
+            f"{memory_report['after_bytes']/1e6:.1f} MB"
+        )
     st.sidebar.markdown("---")
     st.sidebar.markdown("### About")
     st.sidebar.markdown("""
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import openpyxl
+
+from brand_data import read_raw_sheet
+from brand_store import update_brand_store
+
+
+def _write_workbook(path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Raw'
+    ws.append(['DESCRIPTION', 'GEOGRAPHY', 'TIME FRAME', 'Dollars', 'Notes', 'Launched'])
+    ws.append(['HUMBLE', 'TOTAL US', '52 Weeks', 1250.5, 'N/A', datetime(2024, 1, 15)])
+    ws.append(['HUMBLE', 'TOTAL US', '12 Weeks', 310.25, 42, datetime(2024, 3, 1, 9, 30)])
+    ws.append(['RIVAL', 'TOTAL US', '52 Weeks', None, 2.5, None])
+    wb.save(path)
+
+
+def test_reloading_same_workbook_changes_no_rows(tmp_path):
+    workbook = tmp_path / 'brand.xlsx'
+    db_path = str(tmp_path / 'store.db')
+    _write_workbook(workbook)
+
+    first = update_brand_store(read_raw_sheet(workbook), db_path=db_path)
+    second = update_brand_store(read_raw_sheet(workbook), db_path=db_path)
+
+    assert first['added'] == 3
+    assert second['changed'] == 0
+    assert second['unchanged'] == 3
+
+
+def test_changed_mixed_type_cell_is_reported(tmp_path):
+    workbook = tmp_path / 'brand.xlsx'
+    db_path = str(tmp_path / 'store.db')
+    _write_workbook(workbook)
+    update_brand_store(read_raw_sheet(workbook), db_path=db_path)
+
+    new = read_raw_sheet(workbook)
+    new.loc[new['TIME FRAME'] == '12 Weeks', 'Notes'] = 43
+    report = update_brand_store(new, db_path=db_path)
+
+    assert report['changed'] == 1
+    assert report['unchanged'] == 2
@@ -0,0 +1,64 @@
+"""
+SPINS Trend Data
+Loading and preparation of the 'Raw' sheet from the SPINs Humble Trended Sale workbook
+"""
+
+import numpy as np
+import pandas as pd
+
+from brand_data import read_raw_sheet
+from config import TREND_DATA_FILE
+
+
+def parse_time_frame_dates(time_frames):
+    """End date of each TIME FRAME ('12 Weeks Ending 10/05/2025'), parsed once per distinct value"""
+    codes, uniques = pd.factorize(time_frames)
+    dates = pd.to_datetime(
+        pd.Series(uniques, dtype=object).str.extract(r'(\d{2}/\d{2}/\d{4})')[0], format='%m/%d/%Y'
+    )
+    # Missing time frames have code -1 and get NaT
+    return pd.Series(
+        dates.to_numpy().take(codes, mode='clip'), index=time_frames.index, name='Date'
+    ).where(codes >= 0)
+
+
+def read_trend_data(file_source=None):
+    """Load the Raw sheet with numeric measures and a Date parsed from TIME FRAME, sorted by channel and Date"""
+    df = read_raw_sheet(TREND_DATA_FILE if file_source is None else file_source)
+    df['Date'] = parse_time_frame_dates(df['TIME FRAME'])
+    return df.sort_values(['GEOGRAPHY', 'Date'], kind='stable').reset_index(drop=True)
+
+
+class TrendStore:
+    """Trend rows indexed by (GEOGRAPHY, Date)
+
+    Rows are sorted by channel then date, so each channel is one contiguous
+    block and slicing it is a positional lookup instead of a scan. Slices
+    are new frames over the store's data; with copy-on-write (see
+    shared_data) changing one never reaches the store.
+    """
+
+    def __init__(self, df):
+        if not df['GEOGRAPHY'].is_monotonic_increasing:
+            df = df.sort_values(['GEOGRAPHY', 'Date'], kind='stable', na_position='last').reset_index(drop=True)
+        self.frame = df
+
+        geography = df['GEOGRAPHY'].dropna()
+        starts = geography.ne(geography.shift()).to_numpy().nonzero()[0]
+        stops = list(starts[1:]) + [len(geography)]
+        self._ranges = {geography.iloc[start]: (start, stop) for start, stop in zip(starts, stops)}
+
+    @property
+    def geographies(self):
+        return list(self._ranges)
+
+    def channel(self, geography):
+        """One channel's rows in date order, empty if the channel isn't in the file"""
+        start, stop = self._ranges.get(geography, (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def channels(self, geographies):
+        """Rows for several channels, in the order given, gathered in one take"""
+        ranges = [self._ranges[geography] for geography in geographies if geography in self._ranges]
+        positions = np.concatenate([np.arange(start, stop) for start, stop in ranges]) if ranges else []
+        return self.frame.take(positions)
@@ -3,21 +3,37 @@ SPINS Data Updater Script
 This script helps update the dashboard with new weekly SPINS data
 """
 
-import pandas as pd
 import os
 from datetime import datetime
 import shutil
 
+from batch_ingest import ingest_directory
+from brand_data import read_raw_sheet
+from brand_store import update_brand_store
+from config import (
+    ARCHIVE_FOLDER, BRAND_STORE_FILE, HISTORY_DB_FILE,
+    REQUIRED_BRAND_SHEETS, REQUIRED_RAW_COLUMNS, REQUIRED_TREND_SHEETS,
+)
+from data_archive import archive_file
+from workbook_check import check_workbook
+
 class SPINSDataUpdater:
     def __init__(self, data_directory="."):
         self.data_dir = data_directory
-        self.archive_dir = os.path.join(data_directory, "archive")
+        self.archive_dir = os.path.join(data_directory, ARCHIVE_FOLDER)
         os.makedirs(self.archive_dir, exist_ok=True)
 
+    def archive_data_file(self, file_path):
+        """Archive one file, skipping content that is already stored"""
+        file_hash, stored = archive_file(file_path, self.archive_dir)
+        file = os.path.basename(file_path)
+        if stored:
+            print(f"✓ Archived: {file} -> {ARCHIVE_FOLDER}/blobs/{file_hash[:2]}/{file_hash}.gz")
+        else:
+            print(f"✓ Already archived: {file} ({file_hash[:12]})")
+
     def archive_old_data(self):
         """Archive existing data files before updating"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
         # Find existing files
         existing_files = [
             f for f in os.listdir(self.data_dir)
@@ -25,36 +41,43 @@ class SPINSDataUpdater:
         ]
 
         for file in existing_files:
-            src = os.path.join(self.data_dir, file)
-            dst = os.path.join(self.archive_dir, f"{timestamp}_{file}")
-            shutil.copy2(src, dst)
-            print(f"✓ Archived: {file} -> archive/{timestamp}_{file}")
+            self.archive_data_file(os.path.join(self.data_dir, file))
 
     def validate_file(self, filepath, expected_sheets):
-        """Validate that a file has the expected structure"""
-        try:
-            xl_file = pd.ExcelFile(filepath)
-            missing_sheets = set(expected_sheets) - set(xl_file.sheet_names)
-
-            if missing_sheets:
-                print(f"⚠ Warning: Missing sheets in {filepath}: {missing_sheets}")
-                return False
-
-            print(f"✓ Valid: {os.path.basename(filepath)}")
-            return True
-        except Exception as e:
-            print(f"✗ Error validating {filepath}: {e}")
+        """Validate sheet names and Raw headers, reading only the workbook's structure"""
+        problems = check_workbook(filepath, expected_sheets, {'Raw': REQUIRED_RAW_COLUMNS})
+        if problems:
+            print(f"✗ Invalid: {os.path.basename(filepath)}")
+            for problem in problems:
+                print(f"  - {problem}")
             return False
 
-    def update_brand_data(self, new_file_path):
-        """Update the brand and retailers data file"""
-        expected_sheets = ['Raw', 'Pivot', 'Category Charts (52-wks)']
-
+        print(f"✓ Valid: {os.path.basename(filepath)}")
+        return True
+
+    def print_change_report(self, report, by_time_frame=True):
+        """Summarize what an incremental update wrote to the brand store"""
+        print(f"  Added: {report['added']:,}  Changed: {report['changed']:,}  "
+              f"Removed: {report['removed']:,}  Unchanged: {report['unchanged']:,}")
+        if report['duplicate_keys']:
+            print(f"  ⚠ {report['duplicate_keys']:,} duplicate rows ignored (last one kept)")
+        if not by_time_frame:
+            return
+        for change, counts in report['time_frames'].items():
+            for time_frame, count in counts.items():
+                print(f"    {change}: {time_frame} ({count:,} rows)")
+
+    def update_brand_data(self, new_file_path, incremental=False):
+        """Update the brand and retailers data file
+
+        With incremental, the Raw sheet is diffed against the brand store on
+        (DESCRIPTION, GEOGRAPHY, TIME FRAME) and only new or changed rows are written.
+        """
         if not os.path.exists(new_file_path):
             print(f"✗ File not found: {new_file_path}")
             return False
 
-        if self.validate_file(new_file_path, expected_sheets):
+        if self.validate_file(new_file_path, REQUIRED_BRAND_SHEETS):
             # Archive old file
             old_file = os.path.join(self.data_dir, "SPINs Brand and Retailers_110225.xlsx")
             if os.path.exists(old_file):
@@ -65,32 +88,33 @@ class SPINSDataUpdater:
             shutil.copy2(new_file_path, dest_file)
             print(f"✓ Updated brand data: {os.path.basename(new_file_path)}")
 
-            # Load and check data
-            df = pd.read_excel(dest_file, sheet_name='Raw')
+            # Load and check data - the same read feeds the incremental update
+            df = read_raw_sheet(dest_file)
             print(f"  Records: {len(df):,}")
             print(f"  Brands: {df['DESCRIPTION'].nunique()}")
             print(f"  Time periods: {df['TIME FRAME'].unique()}")
 
+            if incremental:
+                store_path = os.path.join(self.data_dir, BRAND_STORE_FILE)
+                report = update_brand_store(df, os.path.basename(new_file_path), store_path)
+                print(f"✓ Updated brand store: {BRAND_STORE_FILE}")
+                self.print_change_report(report)
+
             return True
 
         return False
 
     def update_trend_data(self, new_file_path):
         """Update the Humble trend data file"""
-        expected_sheets = ['Raw', 'Charts']
-
         if not os.path.exists(new_file_path):
             print(f"✗ File not found: {new_file_path}")
             return False
 
-        if self.validate_file(new_file_path, expected_sheets):
+        if self.validate_file(new_file_path, REQUIRED_TREND_SHEETS):
             # Archive old file
             old_file = os.path.join(self.data_dir, "SPINs Humble_Trended Sale_100525.xlsx")
             if os.path.exists(old_file):
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                archive_path = os.path.join(self.archive_dir, f"{timestamp}_{os.path.basename(old_file)}")
-                shutil.copy2(old_file, archive_path)
-                print(f"✓ Archived: {os.path.basename(old_file)}")
+                self.archive_data_file(old_file)
 
             # Copy new file
             dest_file = os.path.join(self.data_dir, os.path.basename(new_file_path))
@@ -98,7 +122,7 @@ class SPINSDataUpdater:
             print(f"✓ Updated trend data: {os.path.basename(new_file_path)}")
 
             # Load and check data
-            df = pd.read_excel(dest_file, sheet_name='Raw')
+            df = read_raw_sheet(dest_file)
             print(f"  Records: {len(df):,}")
             print(f"  Time periods: {df['TIME FRAME'].nunique()}")
 
@@ -106,7 +130,49 @@ class SPINSDataUpdater:
 
         return False
 
-    def run_update(self, brand_file=None, trend_file=None):
+    def ingest_directory(self, directory):
+        """Load every workbook in a directory into the history and brand stores"""
+        print("="*80)
+        print("SPINS BATCH INGEST")
+        print("="*80)
+        print(f"Directory: {directory}")
+        print()
+
+        if not os.path.isdir(directory):
+            print(f"✗ Directory not found: {directory}")
+            return False
+
+        try:
+            results = ingest_directory(
+                directory,
+                os.path.join(self.data_dir, BRAND_STORE_FILE),
+                HISTORY_DB_FILE
+            )
+        except Exception as e:
+            print(f"✗ Ingest failed, nothing was written: {e}")
+            return False
+
+        if not results:
+            print("⚠ No .xlsx files found")
+            return False
+
+        for result in results:
+            if result['status'] == 'failed':
+                print(f"✗ {result['file']}: {result['error']}")
+            elif result['status'] == 'skipped':
+                print(f"⚠ {result['file']}: no report period found, snapshot not saved")
+            elif result['kind'] == 'powertabs':
+                print(f"✓ {result['file']}: PowerTabs snapshot for {result['summary']['period_info']}")
+            else:
+                print(f"✓ {result['file']}: {result['kind']} rows")
+                self.print_change_report(result['report'], by_time_frame=False)
+
+        loaded = sum(result['status'] == 'loaded' for result in results)
+        print()
+        print(f"✓ Loaded {loaded} of {len(results)} files into {BRAND_STORE_FILE} and {HISTORY_DB_FILE}")
+        return loaded == len(results)
+
+    def run_update(self, brand_file=None, trend_file=None, incremental=False):
         """Run the complete update process"""
         print("="*80)
         print("SPINS DATA UPDATER")
@@ -118,7 +184,7 @@ class SPINSDataUpdater:
 
         if brand_file:
             print("Updating Brand & Retailers data...")
-            success &= self.update_brand_data(brand_file)
+            success &= self.update_brand_data(brand_file, incremental)
             print()
 
         if trend_file:
@@ -150,16 +216,24 @@ def main():
     parser.add_argument('--brand-file', help='Path to new brand & retailers Excel file')
     parser.add_argument('--trend-file', help='Path to new trend Excel file')
     parser.add_argument('--data-dir', default='.', help='Data directory (default: current)')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f'Write only new or changed brand rows to {BRAND_STORE_FILE} and report the changes')
+    parser.add_argument('--ingest-dir',
+                        help='Load every PowerTabs, brand and trend workbook in a directory into the data stores')
 
     args = parser.parse_args()
 
-    if not args.brand_file and not args.trend_file:
+    if not args.brand_file and not args.trend_file and not args.ingest_dir:
         print("Error: Please specify at least one file to update")
         print("Usage: python update_data.py --brand-file <path> --trend-file <path>")
+        print("       python update_data.py --ingest-dir <directory>")
         return
 
     updater = SPINSDataUpdater(args.data_dir)
-    updater.run_update(args.brand_file, args.trend_file)
+    if args.ingest_dir:
+        updater.ingest_directory(args.ingest_dir)
+        return
+    updater.run_update(args.brand_file, args.trend_file, args.incremental)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+"""
+SPINS Workbook Checks
+Structural validation read straight from the .xlsx zip: sheet names come from
+xl/workbook.xml and headers from the first rows of each sheet's XML, so a bad
+file is rejected in milliseconds without loading the workbook
+"""
+
+import io
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_DOC_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_CELL_REF = re.compile(r'^([A-Z]+)')
+
+
+def _column_index(cell_ref):
+    index = 0
+    for letter in _CELL_REF.match(cell_ref).group(1):
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _sheet_paths(zf):
+    """Sheet name -> worksheet XML path, in workbook order"""
+    with zf.open('xl/_rels/workbook.xml.rels') as f:
+        targets = {
+            rel.get('Id'): rel.get('Target')
+            for rel in ET.parse(f).getroot().iter(f'{_PKG_REL_NS}Relationship')
+        }
+    with zf.open('xl/workbook.xml') as f:
+        sheets = ET.parse(f).getroot().iter(f'{_MAIN_NS}sheet')
+        paths = {}
+        for sheet in sheets:
+            target = targets.get(sheet.get(f'{_DOC_REL_NS}id'), '')
+            # Targets are usually relative to xl/, but some writers use absolute paths
+            paths[sheet.get('name')] = target.lstrip('/') if target.startswith('/') else posixpath.join('xl', target)
+    return paths
+
+
+def _header_cells(zf, sheet_path, header_row):
+    """Raw cells of one row as (column index, type, value), stopping as soon as it's read"""
+    cells = []
+    row_number = 0
+    with zf.open(sheet_path) as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag != f'{_MAIN_NS}row':
+                continue
+            row_number = int(elem.get('r', row_number + 1))
+            if row_number >= header_row:
+                if row_number == header_row:
+                    for position, cell in enumerate(elem.iter(f'{_MAIN_NS}c')):
+                        index = _column_index(cell.get('r')) if cell.get('r') else position
+                        if cell.get('t') == 'inlineStr':
+                            value = ''.join(t.text or '' for t in cell.iter(f'{_MAIN_NS}t'))
+                        else:
+                            v = cell.find(f'{_MAIN_NS}v')
+                            value = v.text if v is not None else None
+                        cells.append((index, cell.get('t'), value))
+                break
+            elem.clear()
+    return cells
+
+
+def _shared_strings(zf, needed):
+    """The shared strings at the given indexes, reading no further than the last one"""
+    strings = {}
+    if not needed or 'xl/sharedStrings.xml' not in zf.namelist():
+        return strings
+    last = max(needed)
+    index = 0
+    with zf.open('xl/sharedStrings.xml') as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag != f'{_MAIN_NS}si':
+                continue
+            if index in needed:
+                strings[index] = ''.join(t.text or '' for t in elem.iter(f'{_MAIN_NS}t'))
+            if index >= last:
+                break
+            index += 1
+            elem.clear()
+    return strings
+
+
+def read_sheet_headers(file_source, header_rows):
+    """Sheet names and header rows without loading the workbook
+
+    header_rows maps a sheet name to its 1-based header row; sheets the
+    workbook doesn't have are skipped. Returns (sheet_names, headers) where
+    headers maps each sheet read to its header values, with None for blanks.
+    Values are kept verbatim, surrounding spaces included, because the
+    loaders look columns up by the exact header text.
+    """
+    if isinstance(file_source, bytes):
+        file_source = io.BytesIO(file_source)
+    elif hasattr(file_source, 'getvalue'):
+        file_source = io.BytesIO(file_source.getvalue())
+
+    with zipfile.ZipFile(file_source) as zf:
+        sheet_paths = _sheet_paths(zf)
+        row_cells = {
+            sheet: _header_cells(zf, sheet_paths[sheet], row)
+            for sheet, row in header_rows.items() if sheet in sheet_paths
+        }
+        shared = _shared_strings(zf, {
+            int(value) for cells in row_cells.values()
+            for _, kind, value in cells if kind == 's' and value is not None
+        })
+
+    headers = {}
+    for sheet, cells in row_cells.items():
+        values = [None] * (max((index for index, _, _ in cells), default=-1) + 1)
+        for index, kind, value in cells:
+            if kind == 's' and value is not None:
+                value = shared.get(int(value))
+            values[index] = value if value != '' else None
+        headers[sheet] = values
+    return list(sheet_paths), headers
+
+
+def check_workbook(file_source, required_sheets, required_columns=None, header_row=1):
+    """Problems that would stop a workbook loading, as messages; empty when it's valid
+
+    required_columns maps a sheet name to the headers it must have on
+    header_row. Only workbook.xml and those header rows are read.
+    """
+    required_columns = required_columns or {}
+    try:
+        sheet_names, headers = read_sheet_headers(
+            file_source, {sheet: header_row for sheet in required_columns}
+        )
+    except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+        return [f"Not a readable .xlsx workbook: {e}"]
+
+    problems = [f"Missing sheet: {sheet}" for sheet in required_sheets if sheet not in sheet_names]
+    for sheet, columns in required_columns.items():
+        if sheet not in headers:
+            continue
+        missing = [col for col in columns if col not in headers[sheet]]
+        if missing:
+            problems.append(f"{sheet}: missing columns {', '.join(missing)} in row {header_row}")
+    return problems